@@ -1,17 +1,19 @@
 from __future__ import annotations
 from typing import Optional
 import numpy as np
+from ..utils.random_streams import NoiseBuffer
 
 
 class HeartRateMonitor:
-    def __init__(self, buffer_size: int = 150) -> None:
+    def __init__(self, buffer_size: int = 150, rng: Optional[np.random.Generator] = None) -> None:
         self.buffer_size = buffer_size
+        self.noise = NoiseBuffer(rng)
         self.buffer: list[float] = []
         self.fps: float = 30.0
 
     def extract_heart_rate(self, frame: np.ndarray) -> Optional[float]:
         # Placeholder: return a plausible heart rate trend
-        value = 100.0 + 5.0 * np.random.randn()
+        value = 100.0 + 5.0 * self.noise.next()
         self.buffer.append(float(value))
         if len(self.buffer) > self.buffer_size:
             self.buffer.pop(0)
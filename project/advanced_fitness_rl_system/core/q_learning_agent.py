@@ -3,38 +3,113 @@ from typing import Optional
 import numpy as np
 import joblib
 
+from .q_store import CompactQStore
+
 
 class AdvancedQLearningAgent:
-    def __init__(self, state_size: int = 11, num_actions: int = 5, alpha: float = 0.1, gamma: float = 0.95, epsilon: float = 0.1) -> None:
+    def __init__(self, state_size: int = 11, num_actions: int = 5, alpha: float = 0.1, gamma: float = 0.95, epsilon: float = 0.1,
+                 max_states: Optional[int] = None, eviction: str = 'lru', rng: Optional[np.random.Generator] = None) -> None:
         self.state_size = state_size
         self.num_actions = num_actions
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
-        self.q_table: dict = {}
+        # Q-values and visit counts of states rounded to 2 decimals; max_states caps memory
+        self.q_table = CompactQStore(state_size, num_actions, max_entries=max_states, eviction=eviction)
         self.training_rewards: list[float] = []
-
-    def _state_key(self, state: np.ndarray) -> tuple:
-        return tuple(np.round(state, 2))
+        self.rng = rng if rng is not None else np.random.default_rng()  # exploration
 
     def choose_action(self, state: np.ndarray) -> int:
-        if np.random.rand() < self.epsilon:
-            return int(np.random.randint(self.num_actions))
-        key = self._state_key(state)
-        if key not in self.q_table:
-            self.q_table[key] = np.zeros(self.num_actions, dtype=np.float32)
-        return int(np.argmax(self.q_table[key]))
-
-    def learn(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray) -> None:
-        s_key = self._state_key(state)
-        ns_key = self._state_key(next_state)
-        if s_key not in self.q_table:
-            self.q_table[s_key] = np.zeros(self.num_actions, dtype=np.float32)
-        if ns_key not in self.q_table:
-            self.q_table[ns_key] = np.zeros(self.num_actions, dtype=np.float32)
-        td_target = reward + self.gamma * float(np.max(self.q_table[ns_key]))
-        td_error = td_target - float(self.q_table[s_key][action])
-        self.q_table[s_key][action] += self.alpha * td_error
+        if self.rng.random() < self.epsilon:
+            return int(self.rng.integers(self.num_actions))
+        return int(self.choose_greedy(np.asarray(state)[None, :])[0])
+
+    def choose_actions(self, states: np.ndarray) -> np.ndarray:
+        """Epsilon-greedy actions for a batch of states"""
+        greedy = self.choose_greedy(states)
+        explore = self.rng.random(len(greedy)) < self.epsilon
+        return np.where(explore, self.rng.integers(self.num_actions, size=len(greedy)), greedy)
+
+    def choose_greedy(self, states: np.ndarray) -> np.ndarray:
+        # Unseen states are looked up without being added (their Q-values are all zero)
+        ids = self.q_table.find(self.q_table.encode(states))
+        greedy = np.zeros(len(ids), dtype=np.int64)
+        known = ids >= 0
+        greedy[known] = np.argmax(self.q_table.values[ids[known]], axis=1)
+        return greedy
+
+    def learn(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray, done: bool = False) -> None:
+        self.learn_batch(np.asarray(state)[None, :], np.array([action]), np.array([reward]), np.asarray(next_state)[None, :], dones=np.array([done]))
+
+    def learn_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray, weights: Optional[np.ndarray] = None,
+                    dones: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Q-learning update for a batch of transitions; returns their TD errors
+        TD targets use the Q-values from before the batch. Transitions that
+        share a (state, action) pair are applied in order in closed form:
+        with step sizes a_i = alpha * weight_i (importance weights from
+        prioritized replay, 1 by default),
+        q <- q prod_i (1 - a_i) + sum_i a_i target_i prod_{j > i} (1 - a_j),
+        which is what sequential learn() calls with those targets give.
+        Transitions marked done do not bootstrap from their next state.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        n = len(actions)
+        if not n:
+            return np.zeros(0)
+        store = self.q_table
+        try:
+            ids = store.find_or_insert(store.encode(np.concatenate([states, next_states])))
+        except ValueError:
+            # The batch touches more states than a capped store holds: learn it in halves
+            if n == 1:
+                raise
+            half = n // 2
+            return np.concatenate([self.learn_batch(states[part], actions[part], rewards[part], next_states[part],
+                                                    None if weights is None else weights[part], None if dones is None else dones[part])
+                                   for part in (slice(None, half), slice(half, None))])
+        q_matrix = store.values
+        s_idx, ns_idx = ids[:n], ids[n:]
+        td_targets = rewards + self._bootstrap(dones, n) * q_matrix[ns_idx].max(axis=1).astype(np.float64)
+        td_errors = td_targets - q_matrix[s_idx, actions]
+
+        # Group transitions by (state, action), keeping their batch order
+        groups = s_idx * self.num_actions + actions
+        order = np.argsort(groups, kind='stable')
+        sorted_groups = groups[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+        counts = np.diff(np.r_[starts, n])
+        steps = np.full(n, self.alpha) if weights is None else self.alpha * np.asarray(weights, dtype=np.float64)[order]
+
+        # Products of (1 - a_j) over the rest of each group, through cumulative log sums
+        log_decay = np.maximum(np.log1p(-np.minimum(steps, 1.0)), -700.0)
+        cumulative = np.cumsum(log_decay)
+        group_ends = np.repeat(cumulative[starts + counts - 1], counts)
+        contributions = np.add.reduceat(steps * td_targets[order] * np.exp(group_ends - cumulative), starts)
+        group_decay = np.exp(cumulative[starts + counts - 1] - np.r_[0.0, cumulative][starts])
+
+        group_rows, group_actions = np.divmod(sorted_groups[starts], self.num_actions)
+        q_old = q_matrix[group_rows, group_actions].astype(np.float64)
+        q_matrix[group_rows, group_actions] = group_decay * q_old + contributions
+        store.visits[group_rows, group_actions] += counts
+        return td_errors
+
+    def _bootstrap(self, dones: Optional[np.ndarray], n: int) -> np.ndarray:
+        if dones is None:
+            return np.full(n, self.gamma)
+        return self.gamma * (1.0 - np.asarray(dones, dtype=np.float64))
+
+    def td_errors(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray, dones: Optional[np.ndarray] = None) -> np.ndarray:
+        """TD errors of transitions under the current Q-values, without learning or adding states"""
+        store = self.q_table
+        q_values = np.zeros((2 * len(actions), self.num_actions))
+        ids = store.find(store.encode(np.concatenate([states, next_states])), touch=False)
+        known = ids >= 0
+        q_values[known] = store.values[ids[known]]
+        n = len(actions)
+        targets = np.asarray(rewards, dtype=np.float64) + self._bootstrap(dones, n) * q_values[n:].max(axis=1)
+        return targets - q_values[np.arange(n), np.asarray(actions, dtype=np.int64)]
 
     def decay_epsilon(self, min_epsilon: float = 0.01, decay: float = 0.995) -> None:
         self.epsilon = max(min_epsilon, self.epsilon * decay)
@@ -42,21 +117,35 @@ class AdvancedQLearningAgent:
     def save_model(self, path: Optional[str]) -> None:
         if not path:
             return
-        joblib.dump({'q_table': self.q_table, 'meta': {'state_size': self.state_size, 'num_actions': self.num_actions}}, path)
+        joblib.dump({'q_store': self.q_table.state_dict(), 'meta': {'state_size': self.state_size, 'num_actions': self.num_actions}}, path)
 
     def load_model(self, path: Optional[str]) -> None:
         if not path:
             return
+        store = self.q_table
+        self.q_table = CompactQStore(self.state_size, self.num_actions, max_entries=store.max_entries, eviction=store.eviction)
         try:
             data = joblib.load(path)
-            self.q_table = data.get('q_table', {})
+            # Models saved before the compact store kept a dict of rounded state tuples
+            num_states = len(data['q_store']['keys']) if 'q_store' in data else len(data.get('q_table', {}))
+        except Exception:
+            return
+        if store.max_entries is not None and num_states > store.max_entries:
+            # Loading would evict most of the trained model; refuse instead of silently dropping it
+            raise ValueError(f"Model {path} holds {num_states} states, more than max_states={store.max_entries}; "
+                             f"load it with max_states of at least {num_states}")
+        try:
+            if 'q_store' in data:
+                self.q_table.load_state(data['q_store'])
+            else:
+                self.q_table.load_dict(data.get('q_table', {}))
         except Exception:
-            self.q_table = {}
+            self.q_table = CompactQStore(self.state_size, self.num_actions, max_entries=store.max_entries, eviction=store.eviction)
 
     def get_action_confidence(self, state: np.ndarray, action: int) -> float:
-        key = self._state_key(state)
-        if key not in self.q_table:
+        entry_id = int(self.q_table.find(self.q_table.encode(state))[0])
+        if entry_id < 0:
             return 0.5
-        q_vals = self.q_table[key]
+        q_vals = self.q_table.values[entry_id]
         denom = float(np.max(np.abs(q_vals)) + 1e-6)
         return float(max(0.0, min(1.0, (q_vals[action] / denom) * 0.5 + 0.5)))
@@ -0,0 +1,206 @@
+from __future__ import annotations
+from typing import Dict, Any, Iterator, Optional, Tuple
+import numpy as np
+
+# Odd 64-bit multipliers for hashing rounded state vectors
+_HASH_MULTIPLIERS = np.random.default_rng(0x5EED).integers(1, 2**63, size=64, dtype=np.uint64) | np.uint64(1)
+
+
+class CompactQStore:
+    """
+    Q-values of discretized states in contiguous arrays
+    States are keyed by their values rounded to hundredths (as int32 rows).
+    An open-addressing index (linear probing on the high hash bits, load
+    factor at most 1/2) maps them to rows of one float32 Q matrix and an
+    int64 visit-count matrix, so an entry costs about 150 bytes instead of a
+    dict slot, a tuple of NumPy scalars and an ndarray object.
+
+    find() never inserts; find_or_insert() adds missing states. Without
+    max_entries the store grows by doubling; with it, a full store evicts a
+    slice of entries at once, the least recently used ('lru') or the least
+    visited ('lfu').
+    """
+
+    def __init__(self, state_size: int, num_actions: int, capacity: int = 1024, max_entries: Optional[int] = None,
+                 eviction: str = 'lru', evict_fraction: float = 0.1) -> None:
+        if eviction not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.state_size = state_size
+        self.num_actions = num_actions
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self.evict_fraction = evict_fraction
+        self.evictions = 0
+        self._tick = 0
+        self._allocate(min(capacity, max_entries) if max_entries else capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.keys = np.zeros((capacity, self.state_size), dtype=np.int32)
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.zeros((capacity, self.num_actions), dtype=np.float32)
+        self.visits = np.zeros((capacity, self.num_actions), dtype=np.int64)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+        self._index_bits = max(1, (2 * capacity - 1).bit_length())
+        self._index = np.full(1 << self._index_bits, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return int(self.live.sum())
+
+    # Keys
+
+    def encode(self, states: np.ndarray) -> np.ndarray:
+        """int32 hundredths of each state, the same rounding as np.round(state, 2)"""
+        rounded = np.round(np.asarray(states, dtype=np.float32), 2)
+        return np.rint(rounded.astype(np.float64) * 100.0).astype(np.int32).reshape(-1, self.state_size)
+
+    def decode(self, keys: np.ndarray) -> np.ndarray:
+        return np.asarray(keys, dtype=np.float32) / np.float32(100.0)
+
+    def _hash(self, keys: np.ndarray) -> np.ndarray:
+        return (keys.astype(np.int64).astype(np.uint64) * _HASH_MULTIPLIERS[:self.state_size]).sum(axis=1, dtype=np.uint64)
+
+    def _slots(self, hashes: np.ndarray) -> np.ndarray:
+        # High bits: the low bits of a multiply-sum hash are poorly mixed
+        return (hashes >> np.uint64(64 - self._index_bits)).astype(np.int64)
+
+    # Lookups
+
+    def find(self, keys: np.ndarray, touch: bool = True) -> np.ndarray:
+        """Entry id of each key row, -1 when absent; never inserts"""
+        keys = np.asarray(keys, dtype=np.int32).reshape(-1, self.state_size)
+        hashes = self._hash(keys)
+        ids = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        slots = self._slots(hashes)
+        mask = len(self._index) - 1
+        while len(pending):
+            candidates = self._index[slots[pending]]
+            occupied = candidates >= 0
+            safe = np.where(occupied, candidates, 0)
+            match = occupied & (self.hashes[safe] == hashes[pending]) & (self.keys[safe] == keys[pending]).all(axis=1)
+            ids[pending[match]] = candidates[match]
+            pending = pending[occupied & ~match]
+            slots[pending] = (slots[pending] + 1) & mask
+        if touch:
+            self._touch(ids[ids >= 0])
+        return ids
+
+    def find_or_insert(self, keys: np.ndarray) -> np.ndarray:
+        """Entry id of each key row, adding zero-valued entries for new keys (rows may repeat)"""
+        keys = np.asarray(keys, dtype=np.int32).reshape(-1, self.state_size)
+        ids = self.find(keys)
+        missing = np.flatnonzero(ids < 0)
+        if not len(missing):
+            return ids
+
+        # Distinct new keys, grouped by hash and checked exactly
+        new_keys = keys[missing]
+        _, first, inverse = np.unique(self._hash(new_keys), return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        distinct = new_keys[first]
+        if not np.array_equal(distinct[inverse], new_keys):
+            distinct, inverse = np.unique(new_keys, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+
+        self._make_room(len(distinct), protected=ids[ids >= 0])
+        new_ids = np.flatnonzero(~self.live)[:len(distinct)]
+        self.keys[new_ids] = distinct
+        self.hashes[new_ids] = self._hash(distinct)
+        self.values[new_ids] = 0.0
+        self.visits[new_ids] = 0
+        self.live[new_ids] = True
+        self._index_insert(new_ids)
+        self._touch(new_ids)
+        ids[missing] = new_ids[inverse]
+        return ids
+
+    def _touch(self, ids: np.ndarray) -> None:
+        self._tick += 1
+        self.last_used[ids] = self._tick
+
+    def _index_insert(self, ids: np.ndarray) -> None:
+        # Linear probing, placing every id whose slot is free and unclaimed in this round
+        slots = self._slots(self.hashes[ids])
+        mask = len(self._index) - 1
+        pending = np.arange(len(ids))
+        while len(pending):
+            free = self._index[slots[pending]] < 0
+            _, first = np.unique(slots[pending[free]], return_index=True)
+            placed = pending[free][first]
+            self._index[slots[placed]] = ids[placed]
+            pending = np.setdiff1d(pending, placed, assume_unique=True)
+            slots[pending] = np.where(self._index[slots[pending]] >= 0, (slots[pending] + 1) & mask, slots[pending])
+
+    def _rebuild_index(self) -> None:
+        self._index.fill(-1)
+        self._index_insert(np.flatnonzero(self.live))
+
+    # Capacity
+
+    def _make_room(self, needed: int, protected: np.ndarray) -> None:
+        free = self.capacity - len(self)
+        if free >= needed:
+            return
+        if self.max_entries is None or self.capacity < self.max_entries:
+            target = max(2 * self.capacity, len(self) + needed)
+            if self.max_entries is not None:
+                target = min(target, self.max_entries)
+            self._grow(target)
+            free = self.capacity - len(self)
+            if free >= needed:
+                return
+        if needed > self.max_entries - len(np.unique(protected)):
+            raise ValueError(f"{needed} new states do not fit in a store capped at {self.max_entries} entries")
+        self._evict(max(needed - free, int(self.evict_fraction * self.max_entries)), protected)
+
+    def _grow(self, capacity: int) -> None:
+        old = {name: getattr(self, name) for name in ('keys', 'hashes', 'values', 'visits', 'last_used', 'live')}
+        self._allocate(capacity)
+        for name, array in old.items():
+            getattr(self, name)[:len(array)] = array
+        self._rebuild_index()
+
+    def _evict(self, count: int, protected: np.ndarray) -> None:
+        scores = (self.last_used if self.eviction == 'lru' else self.visits.sum(axis=1)).astype(np.float64)
+        scores[~self.live] = np.inf
+        scores[protected] = np.inf
+        count = min(count, int(np.isfinite(scores).sum()))
+        victims = np.argpartition(scores, count - 1)[:count] if count else np.zeros(0, dtype=np.int64)
+        self.live[victims] = False
+        self.evictions += len(victims)
+        self._rebuild_index()
+
+    # Bulk access and persistence
+
+    def ids(self) -> np.ndarray:
+        return np.flatnonzero(self.live)
+
+    def items(self) -> Iterator[Tuple[tuple, np.ndarray]]:
+        """(state key tuple, Q-values) pairs, keys as the legacy dict table used them"""
+        for entry_id in self.ids():
+            yield tuple(self.decode(self.keys[entry_id])), self.values[entry_id]
+
+    def export(self, visited_only: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(keys, values, visits) of live entries"""
+        ids = self.ids()
+        if visited_only:
+            ids = ids[self.visits[ids].sum(axis=1) > 0]
+        return self.keys[ids].copy(), self.values[ids].copy(), self.visits[ids].copy()
+
+    def state_dict(self) -> Dict[str, Any]:
+        keys, values, visits = self.export()
+        return {'keys': keys, 'values': values, 'visits': visits, 'max_entries': self.max_entries, 'eviction': self.eviction}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        ids = self.find_or_insert(state['keys'])
+        self.values[ids] = state['values']
+        self.visits[ids] = state['visits']
+
+    def load_dict(self, q_table: dict) -> None:
+        """Copy a legacy {rounded state tuple: Q-values} table into the store"""
+        if not q_table:
+            return
+        ids = self.find_or_insert(self.encode(np.array(list(q_table.keys()), dtype=np.float32)))
+        self.values[ids] = np.stack(list(q_table.values()))
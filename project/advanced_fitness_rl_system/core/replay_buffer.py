@@ -0,0 +1,173 @@
+from __future__ import annotations
+import json
+import os
+from typing import Optional, Tuple
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of transitions in preallocated NumPy arrays
+    With a path, the arrays are .npy memory maps in that directory and the
+    buffer is reopened (with its contents) by the next run; flush() writes
+    the ring position and size.
+    """
+
+    def __init__(self, capacity: int, state_size: int = 11, path: Optional[str] = None) -> None:
+        self.capacity = capacity
+        self.state_size = state_size
+        self.path = path
+        self.position = 0
+        self.size = 0
+        specs = {
+            'states': (np.float32, (capacity, state_size)),
+            'actions': (np.int64, (capacity,)),
+            'rewards': (np.float32, (capacity,)),
+            'next_states': (np.float32, (capacity, state_size)),
+        }
+        specs.update(self._extra_arrays())
+        meta = self._load_meta()
+        for name, (dtype, shape) in specs.items():
+            setattr(self, name, self._allocate(name, dtype, shape, reuse=meta is not None))
+        if meta is not None:
+            self.position, self.size = meta['position'], meta['size']
+
+    def _extra_arrays(self) -> dict:
+        return {}
+
+    def _load_meta(self) -> Optional[dict]:
+        # Existing buffer files are reused only when their layout matches
+        if not self.path:
+            return None
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('capacity') != self.capacity or meta.get('state_size') != self.state_size:
+            return None
+        return meta
+
+    def _allocate(self, name: str, dtype, shape: Tuple[int, ...], reuse: bool) -> np.ndarray:
+        if not self.path:
+            return np.zeros(shape, dtype=dtype)
+        file_path = os.path.join(self.path, f'{name}.npy')
+        if reuse and os.path.exists(file_path):
+            return np.lib.format.open_memmap(file_path, mode='r+')
+        return np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype, shape=shape)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray) -> None:
+        self.add_batch(np.asarray(state)[None, :], np.array([action]), np.array([reward]), np.asarray(next_state)[None, :])
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+        """Append transitions, overwriting the oldest; returns the slots written"""
+        n = len(actions)
+        if n > self.capacity:
+            # Only the newest capacity transitions would survive
+            states, actions, rewards, next_states = states[-self.capacity:], actions[-self.capacity:], rewards[-self.capacity:], next_states[-self.capacity:]
+            n = self.capacity
+        indices = (self.position + np.arange(n)) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.position = int((self.position + n) % self.capacity)
+        self.size = min(self.capacity, self.size + n)
+        return indices
+
+    def sample(self, batch_size: int, rng: np.random.Generator) -> Tuple[np.ndarray, ...]:
+        """(states, actions, rewards, next_states, indices) drawn uniformly"""
+        indices = rng.integers(0, self.size, size=batch_size)
+        return self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices], indices
+
+    def flush(self) -> None:
+        if not self.path:
+            return
+        for name in self._array_names():
+            getattr(self, name).flush()
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump({'capacity': self.capacity, 'state_size': self.state_size, 'position': self.position, 'size': self.size}, f)
+
+    def _array_names(self) -> Tuple[str, ...]:
+        return ('states', 'actions', 'rewards', 'next_states') + tuple(self._extra_arrays())
+
+
+class SumTree:
+    """Binary tree of priority sums over a flat array; updates and searches are vectorized per level"""
+
+    def __init__(self, capacity: int, tree: Optional[np.ndarray] = None) -> None:
+        self.capacity = capacity
+        self.leaves = 1 << max(0, (capacity - 1).bit_length())
+        self.tree = tree if tree is not None else np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray) -> None:
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Leaf index whose cumulative priority range contains each value"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = self.tree[2 * nodes]
+            go_right = values > left
+            values -= np.where(go_right, left, 0.0)
+            nodes = 2 * nodes + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer sampling transitions in proportion to priority^alpha
+    New transitions get the highest priority seen so far; callers report TD
+    errors back with update_priorities(). Importance-sampling weights are
+    returned with every sample (beta = 1 fully corrects the bias).
+    """
+
+    def __init__(self, capacity: int, state_size: int = 11, path: Optional[str] = None, alpha: float = 0.6, beta: float = 0.4, epsilon: float = 1e-3) -> None:
+        super().__init__(capacity, state_size, path)
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        # The tree array lives with the other arrays, so priorities persist too
+        self.sum_tree = SumTree(capacity, self.priority_tree)
+        self.max_priority = float(self.sum_tree.tree[self.sum_tree.leaves:].max()) or 1.0
+
+    def _extra_arrays(self) -> dict:
+        leaves = 1 << max(0, (self.capacity - 1).bit_length())
+        return {'priority_tree': (np.float64, (2 * leaves,))}
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+        indices = super().add_batch(states, actions, rewards, next_states)
+        self.sum_tree.update(indices, np.full(len(indices), self.max_priority))
+        return indices
+
+    def sample(self, batch_size: int, rng: np.random.Generator) -> Tuple[np.ndarray, ...]:
+        """(states, actions, rewards, next_states, indices, weights), stratified over the priority mass"""
+        total = self.sum_tree.total
+        values = (np.arange(batch_size) + rng.random(batch_size)) * (total / batch_size)
+        indices = np.minimum(self.sum_tree.find(values), self.size - 1)
+        probabilities = self.sum_tree.tree[indices + self.sum_tree.leaves] / total
+        weights = (self.size * np.maximum(probabilities, 1e-12)) ** -self.beta
+        weights /= weights.max()
+        return self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices], indices, weights
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray) -> None:
+        # Duplicate indices in one minibatch keep the last error, as sequential updates would
+        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
+        self.sum_tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
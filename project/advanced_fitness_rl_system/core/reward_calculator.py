@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Dict
+import numpy as np
 
 
 class RewardCalculator:
@@ -27,3 +28,19 @@ class RewardCalculator:
             + self.weights.get('progressive_bonus', 1.0) * progressive_bonus
         )
         return float(total)
+
+    def compute_batch(self, base_reward: np.ndarray, form_score: np.ndarray, injury_risk: np.ndarray, fatigue_level: np.ndarray, recovery_score: np.ndarray, progressive_bonus: np.ndarray) -> np.ndarray:
+        # Same terms as compute(), one element per environment
+        form_modifier = (np.asarray(form_score, dtype=np.float64) - 50.0) / 10.0
+        injury_penalty = -np.asarray(injury_risk, dtype=np.float64) / 5.0
+        fatigue_penalty = -np.asarray(fatigue_level, dtype=np.float64) * 2.0
+        recovery_bonus = np.asarray(recovery_score, dtype=np.float64) / 10.0
+        total = (
+            self.weights['base'] * np.asarray(base_reward, dtype=np.float64)
+            + self.weights['form_bonus'] * form_modifier
+            + self.weights['injury_penalty'] * injury_penalty
+            + self.weights['fatigue_penalty'] * fatigue_penalty
+            + self.weights['recovery_bonus'] * recovery_bonus
+            + self.weights.get('progressive_bonus', 1.0) * np.asarray(progressive_bonus, dtype=np.float64)
+        )
+        return total
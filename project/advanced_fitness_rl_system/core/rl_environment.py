@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 import time
 import numpy as np
 from ..computer_vision.pose_estimator import PoseEstimator
@@ -7,6 +7,7 @@ from ..computer_vision.form_analyzer import FormAnalyzer
 from ..computer_vision.injury_predictor import InjuryPredictor
 from ..computer_vision.heart_rate_monitor import HeartRateMonitor
 from .reward_calculator import RewardCalculator
+from ..utils.random_streams import Clock, NoiseBuffer, hour_of_day
 
 
 @dataclass
@@ -22,25 +23,61 @@ class HealthState:
     preferred_intensity: int = 2
 
 
+# Training stress of each (adapted) action in episodic mode: rest, squat, pushup, burpees, rehab
+TRAINING_LOAD = np.array([0.0, 0.6, 1.0, 1.6, 0.3])
+
+
+def recover_between_sessions(fitness, fatigue, recovery, injury_risk, days_since, streak, action, form_score):
+    """
+    Health change from one session to the next day's (episodic mode)
+    Training load builds fitness in proportion to how fresh the user was and
+    how clean the form was, and adds fatigue; fatigue decays faster the better
+    recovered the user is, and lingering fatigue feeds injury risk. Works on
+    scalars and on arrays of environments alike.
+    """
+    load = TRAINING_LOAD[np.clip(action, 0, 4)]
+    fitness = np.clip(fitness + 0.05 * load * (1.0 - fatigue / 10.0) * (form_score / 100.0) - 0.01 * (days_since >= 3), 0.0, 10.0)
+    fatigue = np.clip(fatigue * (0.85 - 0.25 * recovery / 100.0) + 0.8 * load, 0.0, 10.0)
+    recovery = np.clip(0.6 * recovery + 0.4 * (100.0 - 9.0 * fatigue), 0.0, 100.0)
+    injury_risk = np.clip(injury_risk + 2.0 * np.maximum(0.0, fatigue - 6.0) - 0.5, 0.0, 100.0)
+    trained = np.asarray(action) > 0
+    days_since = np.where(trained, 0, days_since + 1)
+    streak = np.where(trained, streak + 1, 0)
+    return fitness, fatigue, recovery, injury_risk, days_since, streak
+
+
 class AdvancedFitnessEnvironment:
-    def __init__(self, use_camera: bool = False, camera_id: int = 0) -> None:
+    def __init__(self, use_camera: bool = False, camera_id: int = 0, rng: Optional[np.random.Generator] = None, clock: Optional[Clock] = None,
+                 episode_length: Optional[int] = None, hr_rng: Optional[np.random.Generator] = None) -> None:
         self.use_camera = use_camera
         self.camera_id = camera_id
+        # With episode_length, each step is one day and episodes end after that many days
+        self.episode_length = episode_length
+        self._day = 0
+        # Simulated CV noise comes from rng, drawn in blocks; clock feeds time features.
+        # The heart-rate monitor has its own stream (hr_rng), seeded together with rng by spawn_generators
+        if rng is None:
+            rng, default_hr_rng = (np.random.default_rng(child) for child in np.random.SeedSequence().spawn(2))
+            hr_rng = hr_rng if hr_rng is not None else default_hr_rng
+        self.rng = rng
+        self.noise = NoiseBuffer(self.rng)
+        self.clock = clock or time.time
         self.current_health: HealthState = HealthState()
         # CV components (stubs safe when no camera)
         self.pose_estimator = PoseEstimator()
         self.form_analyzer = FormAnalyzer()
         self.injury_predictor = InjuryPredictor()
-        self.hr_monitor = HeartRateMonitor()
+        self.hr_monitor = HeartRateMonitor(rng=hr_rng)
         # Reward calculator
         self.reward_calc = RewardCalculator()
         # Session state
-        self._episode_start_ts: float = time.time()
+        self._episode_start_ts: float = self.clock()
         self._weekly_load: float = 0.5
 
     def reset(self, user_health: HealthState) -> np.ndarray:
         self.current_health = user_health
-        self._episode_start_ts = time.time()
+        self._episode_start_ts = self.clock()
+        self._day = 0
         return self._get_state_vector()
 
     def _get_state_vector(self) -> np.ndarray:
@@ -78,6 +115,15 @@ class AdvancedFitnessEnvironment:
             progressive_bonus=progressive_bonus,
         )
 
+        if self.episode_length:
+            # Episodic mode: the session and the following recovery carry into the next state
+            self._update_health_state_from_execution(form_score, injury_risk, int(heart_rate), adapted_action)
+            self._recover(adapted_action, form_score)
+            self._day += 1
+            info = {'form_score': form_score, 'injury_risk': injury_risk, 'heart_rate': int(heart_rate),
+                    'exercise_completed': adapted_action > 0, 'exercise': exercise_name, 'day': self._day}
+            return self._get_state_vector(), float(reward), self._day >= self.episode_length, info
+
         next_state = self._get_state_vector()
         info = {
             'form_score': form_score,
@@ -92,10 +138,16 @@ class AdvancedFitnessEnvironment:
         done = False
         return next_state, float(reward), done, info
 
+    def _recover(self, action: int, form_score: float) -> None:
+        h = self.current_health
+        fitness, fatigue, recovery, injury, days_since, streak = recover_between_sessions(
+            h.fitness_level, h.fatigue_level, h.recovery_score, h.injury_risk_score, h.days_since_workout, h.current_streak, action, form_score)
+        h.fitness_level, h.fatigue_level, h.recovery_score, h.injury_risk_score = float(fitness), float(fatigue), float(recovery), float(injury)
+        h.days_since_workout, h.current_streak = int(days_since), int(streak)
+
     # Helpers
     def _get_time_of_day_feature(self) -> float:
-        hour = int(time.localtime().tm_hour)
-        return float(hour) / 24.0
+        return float(hour_of_day(self.clock)) / 24.0
 
     def _get_weekly_load_feature(self) -> float:
         return float(self._weekly_load)
@@ -118,9 +170,10 @@ class AdvancedFitnessEnvironment:
 
     def _simulate_cv_execution(self, action: int, duration: int) -> Tuple[float, float, int]:
         base_form = 60.0 + 5.0 * (action - 1)
-        form_score = float(max(0.0, min(100.0, base_form + np.random.randn() * 3.0)))
-        injury_risk = float(max(0.0, min(100.0, 10.0 + 5.0 * (action - 2) + np.random.randn() * 2.0)))
-        heart_rate = int(max(55, min(190, 90 + 12 * action + np.random.randn() * 3.0)))
+        noise = self.noise.take(3)
+        form_score = float(max(0.0, min(100.0, base_form + noise[0] * 3.0)))
+        injury_risk = float(max(0.0, min(100.0, 10.0 + 5.0 * (action - 2) + noise[1] * 2.0)))
+        heart_rate = int(max(55, min(190, 90 + 12 * action + noise[2] * 3.0)))
         return form_score, injury_risk, heart_rate
 
     def _update_health_state_from_execution(self, form_score: float, injury_risk: float, heart_rate: int, action: int) -> None:
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from typing import Optional
+import numpy as np
+import joblib
+
+# Odd 64-bit multipliers for hashing tile coordinates
+_TILE_HASH_MULTIPLIERS = np.random.default_rng(0x711E).integers(1, 2**63, size=65, dtype=np.uint64) | np.uint64(1)
+
+
+class TileCodingQAgent:
+    """
+    Q-learning with a linear approximator over hashed tile coding
+    Each of num_tilings offset grids splits every state dimension into
+    tiles_per_dim tiles; the active tile of each tiling is hashed into a
+    fixed table of memory_size weight rows, so memory never grows with the
+    number of states seen. Same interface as AdvancedQLearningAgent.
+    """
+
+    def __init__(self, state_size: int = 11, num_actions: int = 5, alpha: float = 0.1, gamma: float = 0.95, epsilon: float = 0.1,
+                 num_tilings: int = 8, tiles_per_dim: int = 4, memory_size: int = 2 ** 16, rng: Optional[np.random.Generator] = None) -> None:
+        self.state_size = state_size
+        self.num_actions = num_actions
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.num_tilings = num_tilings
+        self.tiles_per_dim = tiles_per_dim
+        self.memory_size = memory_size
+        self.weights = np.zeros((memory_size, num_actions), dtype=np.float32)
+        self.training_rewards: list[float] = []
+        self.rng = rng if rng is not None else np.random.default_rng()  # exploration
+        # Asymmetric offsets (1, 3, 5, ... tile fractions per tiling) avoid diagonal artefacts
+        displacement = 2 * np.arange(state_size) + 1
+        self._offsets = (np.arange(num_tilings)[:, None] * displacement[None, :] / num_tilings) % 1.0
+
+    def _active_tiles(self, states: np.ndarray) -> np.ndarray:
+        # (batch, num_tilings) weight rows of the active tiles
+        states = np.asarray(states, dtype=np.float64).reshape(-1, self.state_size)
+        coords = np.floor(states[:, None, :] * self.tiles_per_dim + self._offsets[None, :, :]).astype(np.int64)
+        hashes = (coords.astype(np.uint64) * _TILE_HASH_MULTIPLIERS[:self.state_size]).sum(axis=2, dtype=np.uint64)
+        hashes += np.arange(self.num_tilings, dtype=np.uint64) * _TILE_HASH_MULTIPLIERS[-1]
+        return (hashes % np.uint64(self.memory_size)).astype(np.int64)
+
+    def q_values(self, states: np.ndarray) -> np.ndarray:
+        return self.weights[self._active_tiles(states)].sum(axis=1)
+
+    def choose_action(self, state: np.ndarray) -> int:
+        if self.rng.random() < self.epsilon:
+            return int(self.rng.integers(self.num_actions))
+        return int(np.argmax(self.q_values(state)[0]))
+
+    def choose_actions(self, states: np.ndarray) -> np.ndarray:
+        greedy = np.argmax(self.q_values(states), axis=1)
+        explore = self.rng.random(len(greedy)) < self.epsilon
+        return np.where(explore, self.rng.integers(self.num_actions, size=len(greedy)), greedy)
+
+    def learn(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray, done: bool = False) -> None:
+        self.learn_batch(np.asarray(state)[None, :], np.array([action]), np.array([reward]), np.asarray(next_state)[None, :], dones=np.array([done]))
+
+    def learn_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray, weights: Optional[np.ndarray] = None,
+                    dones: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Semi-gradient Q-learning step on a minibatch; returns the TD errors
+        Each weight moves by the mean (importance-weighted) TD error of the
+        transitions that use it, so large batches of similar states do not overshoot.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if not len(actions):
+            return np.zeros(0)
+        tiles = self._active_tiles(states)
+        td_errors = self._td_errors(tiles, actions, rewards, next_states, dones)
+
+        cells = (tiles * self.num_actions + actions[:, None]).ravel()
+        size = self.memory_size * self.num_actions
+        scaled = td_errors if weights is None else td_errors * np.asarray(weights, dtype=np.float64)
+        error_sums = np.bincount(cells, weights=np.repeat(scaled, self.num_tilings), minlength=size)
+        hits = np.bincount(cells, minlength=size)
+        touched = hits > 0
+        flat = self.weights.reshape(-1)
+        flat[touched] += (self.alpha / self.num_tilings) * error_sums[touched] / hits[touched]
+        return td_errors
+
+    def _td_errors(self, tiles: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray, dones: Optional[np.ndarray]) -> np.ndarray:
+        bootstrap = self.gamma if dones is None else self.gamma * (1.0 - np.asarray(dones, dtype=np.float64))
+        td_targets = np.asarray(rewards, dtype=np.float64) + bootstrap * self.q_values(next_states).max(axis=1)
+        return td_targets - self.weights[tiles, actions[:, None]].sum(axis=1)
+
+    def td_errors(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray, dones: Optional[np.ndarray] = None) -> np.ndarray:
+        """TD errors of transitions under the current weights, without learning"""
+        return self._td_errors(self._active_tiles(states), np.asarray(actions, dtype=np.int64), rewards, next_states, dones)
+
+    def decay_epsilon(self, min_epsilon: float = 0.01, decay: float = 0.995) -> None:
+        self.epsilon = max(min_epsilon, self.epsilon * decay)
+
+    def save_model(self, path: Optional[str]) -> None:
+        if not path:
+            return
+        joblib.dump({'weights': self.weights, 'meta': {'state_size': self.state_size, 'num_actions': self.num_actions,
+                                                       'num_tilings': self.num_tilings, 'tiles_per_dim': self.tiles_per_dim,
+                                                       'memory_size': self.memory_size}}, path)
+
+    def load_model(self, path: Optional[str]) -> None:
+        if not path:
+            return
+        try:
+            data = joblib.load(path)
+            if data['weights'].shape == self.weights.shape:
+                self.weights = data['weights']
+        except Exception:
+            self.weights = np.zeros((self.memory_size, self.num_actions), dtype=np.float32)
+
+    def get_action_confidence(self, state: np.ndarray, action: int) -> float:
+        q_vals = self.q_values(state)[0]
+        denom = float(np.max(np.abs(q_vals)) + 1e-6)
+        return float(max(0.0, min(1.0, (q_vals[action] / denom) * 0.5 + 0.5)))
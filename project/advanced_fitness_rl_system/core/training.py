@@ -0,0 +1,159 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import numpy as np
+from .rl_environment import HealthState
+from .q_learning_agent import AdvancedQLearningAgent
+from .q_store import CompactQStore
+from .vector_environment import VectorizedFitnessEnvironment, HealthStateBatch
+from .replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from ..utils.random_streams import Seed, seed_sequence
+
+
+def train_episodes(agent: AdvancedQLearningAgent, env: VectorizedFitnessEnvironment, get_health_state: Callable[[], HealthState], episodes: int) -> None:
+    # env.num_envs episodes at a time: one step each, or episode_length days in an episodic environment
+    remaining = episodes
+    while remaining > 0:
+        k = min(env.num_envs, remaining)
+        s = env.reset(HealthStateBatch.repeat(get_health_state(), env.num_envs))
+        done = False
+        while not done:
+            a = agent.choose_actions(s)
+            ns, r, dones, _ = env.step(a)
+            agent.learn_batch(s[:k], a[:k], r[:k], ns[:k], dones=dones[:k] if env.episode_length else None)
+            s, done = ns, not env.episode_length or dones.all()
+        remaining -= k
+
+
+def train_episodes_with_replay(agent: AdvancedQLearningAgent, env: VectorizedFitnessEnvironment, get_health_state: Callable[[], HealthState], episodes: int,
+                               buffer: ReplayBuffer, replay_ratio: float = 4.0, minibatch_size: int = 256, rng: Optional[np.random.Generator] = None) -> None:
+    # Every new transition is stored, and replay_ratio transitions per new one are replayed in minibatches
+    if env.episode_length:
+        raise ValueError('Replay buffers store one-step transitions without episode ends; use train_episodes for episodic environments')
+    rng = rng if rng is not None else np.random.default_rng()
+    prioritized = isinstance(buffer, PrioritizedReplayBuffer)
+    remaining = episodes
+    while remaining > 0:
+        k = min(env.num_envs, remaining)
+        s = env.reset(HealthStateBatch.repeat(get_health_state(), env.num_envs))
+        a = agent.choose_actions(s)
+        ns, r, _, _ = env.step(a)
+        buffer.add_batch(s[:k], a[:k], r[:k], ns[:k])
+        remaining -= k
+
+        for _ in range(int(np.ceil(replay_ratio * k / minibatch_size))):
+            if prioritized:
+                bs, ba, br, bns, indices, weights = buffer.sample(minibatch_size, rng)
+                buffer.update_priorities(indices, agent.learn_batch(bs, ba, br, bns, weights))
+            else:
+                bs, ba, br, bns, _ = buffer.sample(minibatch_size, rng)
+                agent.learn_batch(bs, ba, br, bns)
+    buffer.flush()
+
+
+def sample_health_state(rng: np.random.Generator) -> HealthState:
+    """A plausible user, used to give each worker a different profile"""
+    return sample_health_states(rng, 1).state(0)
+
+
+def sample_health_states(rng: np.random.Generator, size: int) -> HealthStateBatch:
+    return HealthStateBatch(
+        fitness_level=rng.uniform(1.0, 10.0, size),
+        fatigue_level=rng.uniform(0.0, 8.0, size),
+        recovery_score=rng.uniform(30.0, 100.0, size),
+        heart_rate=rng.integers(55, 120, size),
+        form_quality_avg=rng.uniform(35.0, 90.0, size),
+        injury_risk_score=rng.uniform(0.0, 40.0, size),
+        days_since_workout=rng.integers(0, 15, size),
+        current_streak=rng.integers(0, 31, size),
+        preferred_intensity=rng.integers(1, 4, size),
+    )
+
+
+def merge_q_tables(store: CompactQStore, updates: List[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> None:
+    """
+    Fold worker results into store in place
+    Each update holds the keys of the states a worker updated in the round,
+    its Q-values for them and the visits it made; every action value becomes
+    the visit-weighted mean of the workers that updated it, and actions
+    nobody visited keep their value.
+    """
+    updates = [update for update in updates if len(update[0])]
+    if not updates:
+        return
+    keys = np.concatenate([keys for keys, _, _ in updates])
+    values = np.concatenate([values for _, values, _ in updates]).astype(np.float64)
+    visits = np.concatenate([visits for _, _, visits in updates])
+
+    ids, inverse = np.unique(store.find_or_insert(keys), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    totals = np.zeros((len(ids), store.num_actions), dtype=np.int64)
+    weighted = np.zeros((len(ids), store.num_actions))
+    np.add.at(totals, inverse, visits)
+    np.add.at(weighted, inverse, visits * values)
+
+    merged = store.values[ids]
+    visited = totals > 0
+    merged[visited] = weighted[visited] / totals[visited]
+    store.values[ids] = merged
+    store.visits[ids] += totals
+
+
+def _train_worker(task: Tuple[CompactQStore, Dict[str, Any], np.random.SeedSequence, int, int, Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    store, agent_params, seed_seq, episodes, batch_size, options = task
+    profile_seq, env_seq, agent_seq = seed_seq.spawn(3)
+    agent = AdvancedQLearningAgent(**agent_params, rng=np.random.default_rng(agent_seq))
+    store.visits[:] = 0  # count only this round's visits
+    agent.q_table = store
+    health_state = sample_health_state(np.random.default_rng(profile_seq))
+    env = VectorizedFitnessEnvironment(max(1, min(batch_size, episodes)), rng=np.random.default_rng(env_seq),
+                                       episode_length=options['episode_length'])
+    if options['replay_capacity']:
+        # A fresh in-memory buffer per worker and round; the rounds' Q-tables carry what it learned
+        buffer_cls = PrioritizedReplayBuffer if options['prioritized'] else ReplayBuffer
+        train_episodes_with_replay(agent, env, lambda: health_state, episodes, buffer_cls(options['replay_capacity'], agent.state_size),
+                                   rng=np.random.default_rng(seed_seq.spawn(1)[0]))
+    else:
+        train_episodes(agent, env, lambda: health_state, episodes)
+    # Only states this worker updated are shipped back
+    return store.export(visited_only=True)
+
+
+class ParallelTrainer:
+    """
+    Trains an AdvancedQLearningAgent with rollouts spread over a process pool
+    Every round each worker starts from the current Q-table, trains
+    episodes_per_round episodes with its own seed and sampled user profile,
+    and returns the states it updated; the results are merged by visit-weighted
+    averaging before the next round. Workers run episode_length-day episodes
+    or, with replay_capacity, learn from their own in-memory replay buffer.
+    """
+
+    def __init__(self, num_workers: int = 4, episodes_per_round: int = 100000, batch_size: int = 4096, seed: Seed = None,
+                 episode_length: Optional[int] = None, replay_capacity: int = 0, prioritized: bool = False) -> None:
+        if episode_length and replay_capacity:
+            raise ValueError('Replay buffers store one-step transitions without episode ends; use either episode_length or replay_capacity')
+        self.num_workers = num_workers
+        self.episodes_per_round = episodes_per_round
+        self.batch_size = batch_size
+        self.seed_seq = seed_sequence(seed)
+        self.options = {'episode_length': episode_length, 'replay_capacity': replay_capacity, 'prioritized': prioritized}
+
+    def train(self, agent: AdvancedQLearningAgent, episodes: int, model_path: Optional[str] = None) -> AdvancedQLearningAgent:
+        if not isinstance(agent, AdvancedQLearningAgent):
+            raise TypeError('ParallelTrainer merges Q-tables and needs an AdvancedQLearningAgent')
+        agent_params = {'state_size': agent.state_size, 'num_actions': agent.num_actions, 'alpha': agent.alpha,
+                        'gamma': agent.gamma, 'epsilon': agent.epsilon, 'max_states': agent.q_table.max_entries,
+                        'eviction': agent.q_table.eviction}
+        remaining = episodes
+        with ProcessPoolExecutor(max_workers=self.num_workers) as pool:
+            while remaining > 0:
+                round_episodes = min(remaining, self.episodes_per_round * self.num_workers)
+                shares = [round_episodes // self.num_workers + (i < round_episodes % self.num_workers)
+                          for i in range(self.num_workers)]
+                tasks = [(agent.q_table, agent_params, seq, share, self.batch_size, self.options)
+                         for seq, share in zip(self.seed_seq.spawn(self.num_workers), shares) if share]
+                merge_q_tables(agent.q_table, list(pool.map(_train_worker, tasks)))
+                remaining -= round_episodes
+        agent.save_model(model_path)
+        return agent
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from .q_learning_agent import AdvancedQLearningAgent
+from .tile_coding_agent import TileCodingQAgent
+from .vector_environment import VectorizedFitnessEnvironment
+from .training import sample_health_states
+from ..utils.random_streams import Clock, Seed, seed_sequence
+
+SHARD_NAME = 'trajectories-{:04d}-{:05d}.npz'  # run, shard
+MANIFEST_NAME = 'manifest.json'
+NUM_ACTIONS = 5
+
+
+def generate_trajectories(path: str, num_episodes: int, episode_length: int = 7, num_envs: int = 4096, episodes_per_file: int = 100000,
+                          agent: Optional[AdvancedQLearningAgent] = None, seed: Seed = None, clock: Optional[Clock] = None) -> List[str]:
+    """
+    Simulate episodes in the episodic environment and write them to path as shards
+    Each shard holds up to episodes_per_file episodes column by column:
+    observations (N, T + 1, S) float32, actions (N, T) int8, rewards (N, T)
+    float32 and dones (N, T) bool, saved uncompressed so they load in one read.
+    Every lane starts from its own sampled user profile; without an agent the
+    actions are uniformly random. A manifest names the shards of the
+    latest run, so shards left by an earlier run are never loaded with them.
+    Returns the shard paths.
+    """
+    os.makedirs(path, exist_ok=True)
+    # Shards of a new run get new names, so the previous run stays loadable until the manifest switches
+    previous = _read_manifest(path)
+    run = previous.get('run', 0) + 1
+    profile_seq, env_seq, policy_seq = seed_sequence(seed).spawn(3)
+    profile_rng, policy_rng = np.random.default_rng(profile_seq), np.random.default_rng(policy_seq)
+    env = VectorizedFitnessEnvironment(max(1, min(num_envs, num_episodes)), rng=np.random.default_rng(env_seq), clock=clock,
+                                       episode_length=episode_length)
+    paths = []
+    remaining = num_episodes
+    while remaining > 0:
+        n = min(episodes_per_file, remaining)
+        observations = actions = rewards = dones = None
+        filled = 0
+        while filled < n:
+            k = min(env.num_envs, n - filled)
+            s = env.reset(sample_health_states(profile_rng, env.num_envs))
+            if observations is None:
+                observations = np.empty((n, episode_length + 1, s.shape[1]), dtype=np.float32)
+                actions = np.empty((n, episode_length), dtype=np.int8)
+                rewards = np.empty((n, episode_length), dtype=np.float32)
+                dones = np.empty((n, episode_length), dtype=bool)
+            rows = slice(filled, filled + k)
+            observations[rows, 0] = s[:k]
+            for t in range(episode_length):
+                a = agent.choose_actions(s) if agent is not None else policy_rng.integers(NUM_ACTIONS, size=env.num_envs)
+                s, r, d, _ = env.step(a)
+                observations[rows, t + 1] = s[:k]
+                actions[rows, t] = a[:k]
+                rewards[rows, t] = r[:k]
+                dones[rows, t] = d[:k]
+            filled += k
+        shard_path = os.path.join(path, SHARD_NAME.format(run, len(paths)))
+        np.savez(shard_path, observations=observations, actions=actions, rewards=rewards, dones=dones)
+        paths.append(shard_path)
+        remaining -= n
+
+    shards = [os.path.basename(shard_path) for shard_path in paths]
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({'run': run, 'shards': shards, 'episodes': num_episodes, 'episode_length': episode_length}, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    for stale in previous.get('shards', []):
+        try:
+            os.remove(os.path.join(path, stale))
+        except OSError:
+            pass
+    return paths
+
+
+def _read_manifest(path: str) -> Dict:
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_trajectories(path: str) -> Iterator[Dict[str, np.ndarray]]:
+    """Shards listed in the manifest of the latest generate_trajectories run, one at a time"""
+    manifest = _read_manifest(path)
+    if 'shards' not in manifest:
+        raise FileNotFoundError(f"No trajectory manifest in {path}")
+    for shard in manifest['shards']:
+        with np.load(os.path.join(path, shard)) as data:
+            yield {name: data[name] for name in data.files}
+
+
+def shard_transitions(shard: Dict[str, np.ndarray]) -> Tuple[np.ndarray, ...]:
+    """(states, actions, rewards, next_states, dones) of every step in a shard, flattened"""
+    observations = shard['observations']
+    state_size = observations.shape[2]
+    return (observations[:, :-1].reshape(-1, state_size), shard['actions'].reshape(-1).astype(np.int64), shard['rewards'].reshape(-1),
+            observations[:, 1:].reshape(-1, state_size), shard['dones'].reshape(-1))
+
+
+def train_offline(agent: AdvancedQLearningAgent, path: str, epochs: int = 1, minibatch_size: int = 4096, rng: Optional[np.random.Generator] = None) -> None:
+    # Shuffled minibatches of stored transitions, one shard in memory at a time
+    rng = rng if rng is not None else np.random.default_rng()
+    for _ in range(epochs):
+        for shard in load_trajectories(path):
+            s, a, r, ns, d = shard_transitions(shard)
+            order = rng.permutation(len(a))
+            for start in range(0, len(order), minibatch_size):
+                batch = order[start:start + minibatch_size]
+                agent.learn_batch(s[batch], a[batch], r[batch], ns[batch], dones=d[batch])
+
+
+def evaluate_offline(agent: AdvancedQLearningAgent, path: str) -> Dict[str, float]:
+    """Mean absolute TD error of the agent on the stored transitions, and the mean episode return of the data"""
+    transitions = episodes = 0
+    abs_error = total_return = 0.0
+    for shard in load_trajectories(path):
+        s, a, r, ns, d = shard_transitions(shard)
+        abs_error += float(np.abs(agent.td_errors(s, a, r, ns, d)).sum())
+        total_return += float(shard['rewards'].sum(dtype=np.float64))
+        transitions += len(a)
+        episodes += len(shard['actions'])
+    return {'transitions': transitions, 'episodes': episodes,
+            'mean_abs_td_error': abs_error / max(1, transitions), 'mean_return': total_return / max(1, episodes)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Generate episodic trajectories and train agents from them offline')
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help='simulate episodes into trajectory shards')
+    generate.add_argument('path', type=str)
+    generate.add_argument('--episodes', type=int, default=1000000)
+    generate.add_argument('--episode-length', type=int, default=7, help='days per episode')
+    generate.add_argument('--num-envs', type=int, default=4096)
+    generate.add_argument('--episodes-per-file', type=int, default=100000)
+    generate.add_argument('--seed', type=int, default=None)
+    train = commands.add_parser('train', help='train an agent on trajectory shards and report its TD error on them')
+    train.add_argument('path', type=str)
+    train.add_argument('--epochs', type=int, default=1)
+    train.add_argument('--minibatch-size', type=int, default=4096)
+    train.add_argument('--agent', choices=['tabular', 'tile'], default='tabular')
+    train.add_argument('--max-states', type=int, default=None, help='cap on tabular Q-table entries')
+    train.add_argument('--model-path', type=str, default=None)
+    train.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        paths = generate_trajectories(args.path, args.episodes, episode_length=args.episode_length, num_envs=args.num_envs,
+                                      episodes_per_file=args.episodes_per_file, seed=args.seed)
+        print(f"Wrote {args.episodes} episodes to {len(paths)} shards in {args.path}")
+        return
+
+    agent_seq, shuffle_seq = seed_sequence(args.seed).spawn(2)
+    if args.agent == 'tile':
+        agent = TileCodingQAgent(rng=np.random.default_rng(agent_seq))
+    else:
+        agent = AdvancedQLearningAgent(max_states=args.max_states, rng=np.random.default_rng(agent_seq))
+    before = evaluate_offline(agent, args.path)
+    train_offline(agent, args.path, epochs=args.epochs, minibatch_size=args.minibatch_size, rng=np.random.default_rng(shuffle_seq))
+    after = evaluate_offline(agent, args.path)
+    agent.save_model(args.model_path)
+    print(f"{after['transitions']} transitions from {after['episodes']} episodes (mean return {after['mean_return']:.1f})")
+    print(f"Mean |TD error|: {before['mean_abs_td_error']:.2f} before, {after['mean_abs_td_error']:.2f} after training")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+from dataclasses import dataclass, fields
+from typing import Tuple, Dict, Any, List, Optional
+import numpy as np
+from .rl_environment import HealthState, recover_between_sessions
+from .reward_calculator import RewardCalculator
+from ..utils.random_streams import Clock, hour_of_day
+
+# Per-action constants of AdvancedFitnessEnvironment.step
+BASE_REWARDS = np.array([0, 10, 20, 30, 15], dtype=np.float64)
+INT_FIELDS = ('heart_rate', 'days_since_workout', 'current_streak', 'preferred_intensity')
+
+
+@dataclass
+class HealthStateBatch:
+    """HealthState of K environments as struct-of-arrays (one array per field)"""
+    fitness_level: np.ndarray
+    fatigue_level: np.ndarray
+    recovery_score: np.ndarray
+    heart_rate: np.ndarray
+    form_quality_avg: np.ndarray
+    injury_risk_score: np.ndarray
+    days_since_workout: np.ndarray
+    current_streak: np.ndarray
+    preferred_intensity: np.ndarray
+
+    @classmethod
+    def from_states(cls, states: List[HealthState]) -> 'HealthStateBatch':
+        return cls(**{f.name: np.array([getattr(s, f.name) for s in states],
+                                       dtype=np.int64 if f.name in INT_FIELDS else np.float64)
+                      for f in fields(cls)})
+
+    @classmethod
+    def repeat(cls, state: HealthState, size: int) -> 'HealthStateBatch':
+        return cls(**{f.name: np.full(size, getattr(state, f.name),
+                                      dtype=np.int64 if f.name in INT_FIELDS else np.float64)
+                      for f in fields(cls)})
+
+    def __len__(self) -> int:
+        return len(self.fitness_level)
+
+    def state(self, index: int) -> HealthState:
+        return HealthState(**{f.name: getattr(self, f.name)[index].item() for f in fields(self)})
+
+
+class VectorizedFitnessEnvironment:
+    """
+    Steps num_envs independent copies of AdvancedFitnessEnvironment at once
+    The dynamics, reward and state features are those of the scalar
+    environment, computed with array operations; simulated CV noise for all
+    environments is drawn in one call per step.
+    """
+
+    def __init__(self, num_envs: int, reward_calc: Optional[RewardCalculator] = None, rng: Optional[np.random.Generator] = None, clock: Optional[Clock] = None,
+                 episode_length: Optional[int] = None) -> None:
+        self.num_envs = num_envs
+        # Episodic mode as in AdvancedFitnessEnvironment: one step per day, all lanes end together
+        self.episode_length = episode_length
+        self.day = 0
+        self.reward_calc = reward_calc or RewardCalculator()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.clock = clock
+        self.health = HealthStateBatch.repeat(HealthState(), num_envs)
+        self.weekly_load = np.full(num_envs, 0.5)
+        self._time_of_day = self._get_time_of_day_feature()
+
+    def reset(self, health: HealthStateBatch) -> np.ndarray:
+        if len(health) != self.num_envs:
+            raise ValueError(f"Expected {self.num_envs} health states, got {len(health)}")
+        # Copy so the caller's arrays are not modified by step()
+        self.health = HealthStateBatch(**{f.name: getattr(health, f.name).copy() for f in fields(health)})
+        self._time_of_day = self._get_time_of_day_feature()
+        self.day = 0
+        return self._get_state_vectors()
+
+    def _get_state_vectors(self) -> np.ndarray:
+        h = self.health
+        columns = [
+            h.fitness_level / 10.0,
+            h.fatigue_level / 10.0,
+            h.recovery_score / 100.0,
+            np.minimum(h.heart_rate, 200) / 200.0,
+            h.form_quality_avg / 100.0,
+            h.injury_risk_score / 100.0,
+            np.minimum(h.days_since_workout, 14) / 14.0,
+            np.minimum(h.current_streak, 30) / 30.0,
+            h.preferred_intensity / 3.0,
+            np.full(self.num_envs, self._time_of_day),
+            self.weekly_load,
+        ]
+        return np.stack(columns, axis=1).astype(np.float32)
+
+    def step(self, actions: np.ndarray, exercise_duration: int = 300) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        actions = np.asarray(actions, dtype=np.int64)
+        adapted = self._adapt_difficulty(actions, self.health.form_quality_avg)
+        form_score, injury_risk, heart_rate = self._simulate_cv_execution(adapted)
+
+        rewards = self.reward_calc.compute_batch(
+            base_reward=BASE_REWARDS[np.clip(adapted, 0, 4)],
+            form_score=form_score,
+            injury_risk=injury_risk,
+            fatigue_level=self.health.fatigue_level,
+            recovery_score=self.health.recovery_score,
+            progressive_bonus=np.where(adapted >= 2, 1.0, 0.2),
+        )
+
+        if self.episode_length:
+            self._update_health_state_from_execution(form_score, injury_risk, heart_rate, adapted)
+            h = self.health
+            (h.fitness_level, h.fatigue_level, h.recovery_score, h.injury_risk_score,
+             h.days_since_workout, h.current_streak) = recover_between_sessions(
+                h.fitness_level, h.fatigue_level, h.recovery_score, h.injury_risk_score,
+                h.days_since_workout, h.current_streak, adapted, form_score)
+            self.day += 1
+            info = {'form_score': form_score, 'injury_risk': injury_risk, 'heart_rate': heart_rate, 'adapted_action': adapted}
+            return self._get_state_vectors(), rewards, np.full(self.num_envs, self.day >= self.episode_length), info
+
+        # As in the scalar environment, the returned state precedes the health update
+        next_states = self._get_state_vectors()
+        info = {
+            'form_score': form_score,
+            'injury_risk': injury_risk,
+            'heart_rate': heart_rate,
+            'exercise_completed': adapted > 0,
+            'fatigue_increase': np.maximum(0.0, 0.3 * adapted),
+            'adapted_action': adapted,
+        }
+        self._update_health_state_from_execution(form_score, injury_risk, heart_rate, adapted)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        return next_states, rewards, dones, info
+
+    def _get_time_of_day_feature(self) -> float:
+        return float(hour_of_day(self.clock)) / 24.0
+
+    def _adapt_difficulty(self, actions: np.ndarray, avg_form: np.ndarray) -> np.ndarray:
+        adapted = np.where(avg_form > 75.0, np.minimum(4, actions + 1),
+                           np.where(avg_form < 45.0, np.maximum(1, actions - 1), actions))
+        return np.where(actions <= 0, 0, adapted)
+
+    def _simulate_cv_execution(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        noise = self.rng.standard_normal((3, self.num_envs))
+        form_score = np.clip(60.0 + 5.0 * (actions - 1) + noise[0] * 3.0, 0.0, 100.0)
+        injury_risk = np.clip(10.0 + 5.0 * (actions - 2) + noise[1] * 2.0, 0.0, 100.0)
+        heart_rate = np.clip(90 + 12 * actions + noise[2] * 3.0, 55, 190).astype(np.int64)
+        return form_score, injury_risk, heart_rate
+
+    def _update_health_state_from_execution(self, form_score: np.ndarray, injury_risk: np.ndarray, heart_rate: np.ndarray, actions: np.ndarray) -> None:
+        h = self.health
+        h.form_quality_avg = 0.8 * h.form_quality_avg + 0.2 * form_score
+        h.injury_risk_score = 0.7 * h.injury_risk_score + 0.3 * injury_risk
+        h.heart_rate = heart_rate
+        h.fatigue_level = np.minimum(10.0, h.fatigue_level + 0.2 * actions)
+        self.weekly_load = np.clip(self.weekly_load + 0.02 * actions - 0.01, 0.0, 1.0)
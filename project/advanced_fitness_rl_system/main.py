@@ -1,21 +1,36 @@
 import argparse
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from .core.rl_environment import AdvancedFitnessEnvironment, HealthState
 from .core.q_learning_agent import AdvancedQLearningAgent
+from .core.tile_coding_agent import TileCodingQAgent
+from .core.vector_environment import VectorizedFitnessEnvironment
+from .core.training import train_episodes, train_episodes_with_replay, ParallelTrainer
+from .core.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
 from .data.user_profile import EnhancedUserProfile
 from .data.exercise_database import ComprehensiveExerciseDatabase
 from .ui.camera_interface import CameraInterface
 from .research.data_collector import ResearchDataCollector
 from .utils.visualization import AdvancedVisualization
+from .utils.random_streams import Clock, Seed, seed_sequence, spawn_generators
 
 
 class AdvancedFitnessSystem:
-    def __init__(self, username: str, use_camera: bool = True) -> None:
+    def __init__(self, username: str, use_camera: bool = True, agent_mode: str = 'tabular', max_states: Optional[int] = None, eviction: str = 'lru',
+                 seed: Seed = None, clock: Optional[Clock] = None) -> None:
         self.username = username
         self.use_camera = use_camera
-        self.env = AdvancedFitnessEnvironment(use_camera=use_camera)
-        self.agent = AdvancedQLearningAgent()
+        # Every random component gets its own stream; the same seed and clock reproduce a run
+        self.seed_seq = seed_sequence(seed)
+        self.clock = clock
+        self.rngs = spawn_generators(self.seed_seq)
+        self.env = AdvancedFitnessEnvironment(use_camera=use_camera, rng=self.rngs['environment'], clock=clock,
+                                              hr_rng=self.rngs['heart_rate'])
+        # 'tile' keeps memory fixed with a tile-coded linear approximator
+        if agent_mode == 'tile':
+            self.agent = TileCodingQAgent(rng=self.rngs['agent'])
+        else:
+            self.agent = AdvancedQLearningAgent(max_states=max_states, eviction=eviction, rng=self.rngs['agent'])
         self.user_profile = EnhancedUserProfile(username)
         self.exercise_db = ComprehensiveExerciseDatabase()
         self.camera_interface = CameraInterface() if use_camera else None
@@ -49,27 +64,78 @@ class AdvancedFitnessSystem:
         summary = self.camera_interface.start_monitoring(exercise=recommendation['exercise_name'], duration=recommendation['duration'])
         return {'session_data': summary, 'performance_score': float(max(0.0, min(100.0, summary.get('average_form_score', 50.0))))}
 
-    def train_agent(self, episodes: int = 100) -> None:
-        for _ in range(episodes):
-            hs = self.user_profile.get_current_health_state()
-            s = self.env.reset(hs)
-            a = self.agent.choose_action(s)
-            ns, r, _, _ = self.env.step(a)
-            self.agent.learn(s, a, r, ns)
+    def train_agent(self, episodes: int = 100, batch_size: int = 1024, replay: Optional[ReplayBuffer] = None, episode_length: Optional[int] = None) -> None:
+        # episode_length trains on multi-day episodes where fatigue and recovery carry over
+        if batch_size <= 1:
+            env = self.env
+            if episode_length:
+                env = AdvancedFitnessEnvironment(use_camera=False, rng=self.rngs['training'], clock=self.clock, episode_length=episode_length,
+                                                 hr_rng=self.rngs['heart_rate'])
+            for _ in range(episodes):
+                hs = self.user_profile.get_current_health_state()
+                s = env.reset(hs)
+                done = False
+                while not done:
+                    a = self.agent.choose_action(s)
+                    ns, r, done, _ = env.step(a)
+                    self.agent.learn(s, a, r, ns, done=done)
+                    s, done = ns, done or not episode_length
+            self.agent.save_model(None)
+            return
+
+        # Run batch_size episodes at a time in a vectorized environment
+        vec_env = VectorizedFitnessEnvironment(max(1, min(batch_size, episodes)), reward_calc=self.env.reward_calc,
+                                               rng=self.rngs['training'], clock=self.clock, episode_length=episode_length)
+        if replay is not None:
+            train_episodes_with_replay(self.agent, vec_env, self.user_profile.get_current_health_state, episodes, replay,
+                                       rng=self.rngs['replay'])
+        else:
+            train_episodes(self.agent, vec_env, self.user_profile.get_current_health_state, episodes)
         self.agent.save_model(None)
 
+    def train_agent_parallel(self, episodes: int, workers: int = 4, batch_size: int = 4096, model_path: Optional[str] = None, seed: Seed = None,
+                             episode_length: Optional[int] = None, replay_capacity: int = 0, prioritized: bool = False) -> None:
+        trainer = ParallelTrainer(num_workers=workers, batch_size=batch_size, seed=seed if seed is not None else self.seed_seq.spawn(1)[0],
+                                  episode_length=episode_length, replay_capacity=replay_capacity, prioritized=prioritized)
+        trainer.train(self.agent, episodes, model_path)
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description='Advanced AI Fitness System (minimal)')
     parser.add_argument('--username', type=str, default='user')
     parser.add_argument('--train', type=int, default=0)
+    parser.add_argument('--train-batch-size', type=int, default=1024, help='episodes simulated per vectorized step (1 = scalar loop)')
+    parser.add_argument('--workers', type=int, default=1, help='train in a process pool with this many workers')
+    parser.add_argument('--model-path', type=str, default=None, help='where parallel training saves the merged model')
+    parser.add_argument('--agent', choices=['tabular', 'tile'], default='tabular')
+    parser.add_argument('--max-states', type=int, default=None, help='cap on tabular Q-table entries')
+    parser.add_argument('--eviction', choices=['lru', 'lfu'], default='lru', help='which states a full Q-table drops')
+    parser.add_argument('--replay-capacity', type=int, default=0, help='train from an experience replay buffer of this size')
+    parser.add_argument('--prioritized', action='store_true', help='sample the replay buffer by TD error')
+    parser.add_argument('--replay-path', type=str, default=None, help='directory keeping the replay buffer across runs')
+    parser.add_argument('--episode-length', type=int, default=None, help='train on episodes of this many days instead of single sessions')
+    parser.add_argument('--seed', type=int, default=None, help='seed for reproducible simulation and training')
     parser.add_argument('--no-camera', action='store_true')
     args = parser.parse_args()
+    if args.episode_length and args.replay_capacity > 0:
+        parser.error('--episode-length cannot be combined with --replay-capacity (replay buffers do not store episode ends)')
+    if args.workers > 1 and args.agent == 'tile':
+        parser.error('--workers merges tabular Q-tables and cannot be used with --agent tile')
+    if args.workers > 1 and args.replay_path:
+        parser.error('--replay-path cannot be used with --workers; parallel workers keep in-memory replay buffers')
 
-    system = AdvancedFitnessSystem(username=args.username, use_camera=not args.no_camera)
+    system = AdvancedFitnessSystem(username=args.username, use_camera=not args.no_camera, agent_mode=args.agent,
+                                   max_states=args.max_states, eviction=args.eviction, seed=args.seed)
 
-    if args.train > 0:
-        system.train_agent(args.train)
+    if args.train > 0 and args.workers > 1:
+        system.train_agent_parallel(args.train, workers=args.workers, batch_size=args.train_batch_size, model_path=args.model_path,
+                                    episode_length=args.episode_length, replay_capacity=args.replay_capacity, prioritized=args.prioritized)
+    elif args.train > 0:
+        replay = None
+        if args.replay_capacity > 0:
+            buffer_cls = PrioritizedReplayBuffer if args.prioritized else ReplayBuffer
+            replay = buffer_cls(args.replay_capacity, path=args.replay_path)
+        system.train_agent(args.train, batch_size=args.train_batch_size, replay=replay, episode_length=args.episode_length)
 
     rec = system.get_ai_recommendation()
     print(f"Recommendation: {rec['exercise_name']} ({rec['intensity']}) for {rec['duration']}s | conf={rec['ai_confidence']:.2f}")
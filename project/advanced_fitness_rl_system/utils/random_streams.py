@@ -0,0 +1,51 @@
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, Optional, Union
+import time
+import numpy as np
+
+Seed = Union[None, int, np.random.SeedSequence]
+Clock = Callable[[], float]  # seconds since the epoch, like time.time
+
+# Independent streams of the simulator, in spawn order
+STREAM_NAMES = ('environment', 'agent', 'training', 'replay', 'heart_rate')
+
+
+def seed_sequence(seed: Seed) -> np.random.SeedSequence:
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def spawn_generators(seed: Seed = None, names: Iterable[str] = STREAM_NAMES) -> Dict[str, np.random.Generator]:
+    """One Generator per name, spawned from the same SeedSequence so the streams are independent"""
+    names = tuple(names)
+    return {name: np.random.default_rng(child) for name, child in zip(names, seed_sequence(seed).spawn(len(names)))}
+
+
+def fixed_clock(timestamp: float) -> Clock:
+    """A clock frozen at timestamp, for reproducible time-of-day features"""
+    return lambda: timestamp
+
+
+def hour_of_day(clock: Optional[Clock] = None) -> int:
+    return int(time.localtime((clock or time.time)()).tm_hour)
+
+
+class NoiseBuffer:
+    """Standard normal draws taken from a generator in blocks instead of one scalar per call"""
+
+    def __init__(self, rng: Optional[np.random.Generator] = None, block_size: int = 4096) -> None:
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.block_size = block_size
+        self._block = np.empty(0)
+        self._pos = 0
+
+    def take(self, n: int) -> np.ndarray:
+        if self._pos + n > len(self._block):
+            rest = self._block[self._pos:]
+            self._block = np.concatenate([rest, self.rng.standard_normal(max(self.block_size, n))])
+            self._pos = 0
+        values = self._block[self._pos:self._pos + n]
+        self._pos += n
+        return values
+
+    def next(self) -> float:
+        return float(self.take(1)[0])
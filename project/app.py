@@ -1,24 +1,126 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, abort, make_response
 from project.models import db, User, Workout, WorkoutHistory
 
 
 from project.rl_agent import WorkoutRecommendationAgent, EnhancedWorkoutRecommendationAgent
+from project.feedback_store import FeedbackAggregateStore
+from project.catalog import workout_catalog
+from project.batch_recommendations import BatchRecommendationService, validate_requests, MAX_BATCH_REQUESTS, MAX_RECOMMENDATIONS
+from project.migrations import apply_migrations
+from project.feedback_queue import FeedbackQueue
+from project.response_cache import ResponseCache
+from project.instrumentation import Instrumentation
+from project.bulk_ingest import BulkCompletionIngester, parse_completions, MAX_BATCH_SIZE
+from project.history_pages import history_page, history_summary, history_entry_json, page_size
 
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
+from functools import wraps
 import json
 import os
 
-def create_app():
+# Perceived intensity labels from the enhanced workout form on the 1-10 history scale
+INTENSITY_SCALE = {'low': 3, 'medium': 6, 'high': 9}
+
+def create_app(config=None):
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'your-secret-key-here'
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///workout_recommendations.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Write-behind Q-table persistence: records per fsync and per compaction
+    app.config['Q_TABLE_FSYNC_BATCH'] = 32
+    app.config['Q_TABLE_COMPACT_EVERY'] = 1000
+    
+    # Memory-mapped Q-table shared by all worker processes (disabled when unset)
+    app.config['SHARED_Q_TABLE_PATH'] = os.environ.get('FITREC_SHARED_Q_TABLE')
+    
+    # Pending model updates held by the background feedback consumer before requests apply them inline
+    app.config['FEEDBACK_QUEUE_CAPACITY'] = 1000
+    
+    # Per-user cache of rendered pages and API responses
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+    app.config['RESPONSE_CACHE_TTL'] = 300  # seconds
+    
+    # Key required by service-to-service endpoints such as batch recommendations (disabled when unset)
+    app.config['API_KEY'] = os.environ.get('FITREC_API_KEY')
+    
+    # Opt-in request/query/span timing served on /metrics
+    app.config['INSTRUMENTATION_ENABLED'] = os.environ.get('FITREC_INSTRUMENTATION', '') not in ('', '0')
+    
+    # Overrides for benchmarks and tools that run against another database
+    if config:
+        app.config.update(config)
+    
     db.init_app(app)
+    instrumentation = Instrumentation(enabled=app.config['INSTRUMENTATION_ENABLED'])
+    
+    # Per-user feedback aggregates shared by the agents and analytics views
+    feedback_store = FeedbackAggregateStore()
     
     # Initialize RL agents
-    rl_agent = WorkoutRecommendationAgent()
-    enhanced_agent = EnhancedWorkoutRecommendationAgent()
+    rl_agent = WorkoutRecommendationAgent(feedback_store=feedback_store)
+    q_log_options = {
+        'fsync_batch': app.config['Q_TABLE_FSYNC_BATCH'],
+        'compact_every': app.config['Q_TABLE_COMPACT_EVERY']
+    }
+    enhanced_agent = EnhancedWorkoutRecommendationAgent(catalog=workout_catalog, q_log_options=q_log_options,
+                                                        shared_q_table_path=app.config['SHARED_Q_TABLE_PATH'])
+    
+    # Bulk recommendations for the overnight scheduler (see batch_recommendations.py)
+    batch_service = BatchRecommendationService(rl_agent, enhanced_agent, catalog=workout_catalog)
+    app.extensions['batch_recommendations'] = batch_service
+    
+    # Model updates are applied off the request path by a background consumer
+    feedback_queue = FeedbackQueue(capacity=app.config['FEEDBACK_QUEUE_CAPACITY'])
+    app.extensions['feedback_queue'] = feedback_queue
+    
+    # Rendered responses keyed by user and catalog version, dropped when the user's inputs change
+    response_cache = ResponseCache(max_bytes=app.config['RESPONSE_CACHE_MAX_BYTES'],
+                                   ttl=app.config['RESPONSE_CACHE_TTL'])
+    app.extensions['response_cache'] = response_cache
+    
+    # Bulk completion sync for wearables and gym kiosks
+    bulk_ingester = BulkCompletionIngester(rl_agent, feedback_store, feedback_queue,
+                                           on_commit=response_cache.invalidate_users)
+    
+    def user_data_version(user_id):
+        """
+        Cheap fingerprint of a user's cache inputs, read from the database
+        invalidate_user() only clears the worker that handled a write; with the
+        newest history id and the profile columns in the key, other workers
+        miss on their stale entries instead of serving them until the TTL.
+        """
+        newest_history = db.session.query(db.func.max(WorkoutHistory.id)).filter(
+            WorkoutHistory.user_id == user_id).scalar_subquery()
+        return db.session.query(newest_history, User.age, User.weight, User.height, User.fitness_level,
+                                User.goals, User.preferences).filter(User.id == user_id).first()
+    
+    def cached_response(view):
+        """
+        Serve repeat GETs of a per-user view from the response cache
+        A hit skips the view but still costs one database round trip for
+        user_data_version(); with the cache disabled the view runs directly.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get('user_id')
+            # Pending flash messages are shown once, so those renders are never cached
+            if (not response_cache.enabled or user_id is None or request.method != 'GET'
+                    or session.get('_flashes')):
+                return view(*args, **kwargs)
+            
+            key = (user_id, request.endpoint, request.query_string, workout_catalog.version,
+                   tuple(user_data_version(user_id) or ()))
+            cached = response_cache.get(key)
+            if cached is not None:
+                return app.response_class(cached.body, status=cached.status, mimetype=cached.mimetype)
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough and not session.modified:
+                response_cache.set(key, response.get_data(), response.status_code, response.mimetype)
+            return response
+        return wrapper
     
     @app.route('/')
     def index():
@@ -86,6 +188,7 @@ def create_app():
         return redirect(url_for('index'))
     
     @app.route('/dashboard')
+    @cached_response
     def dashboard():
         if 'user_id' not in session:
             return redirect(url_for('login'))
@@ -97,6 +200,7 @@ def create_app():
         
         # Get recent workout history
         recent_workouts = WorkoutHistory.query.filter_by(user_id=user.id)\
+            .options(joinedload(WorkoutHistory.workout))\
             .order_by(WorkoutHistory.date.desc()).limit(5).all()
         
         # Get user insights
@@ -105,6 +209,7 @@ def create_app():
         return render_template('dashboard.html', user=user, recent_workouts=recent_workouts, insights=insights)
     
     @app.route('/recommendations')
+    @cached_response
     def recommendations():
         if 'user_id' not in session:
             return redirect(url_for('login'))
@@ -114,11 +219,12 @@ def create_app():
             session.clear()
             return redirect(url_for('login'))
         
-        # Get all available workouts
-        available_workouts = Workout.query.all()
+        # Get all available workouts from the cached catalog
+        available_workouts = workout_catalog.snapshot()
         
         # Get personalized recommendations
-        recommended_workouts = rl_agent.get_recommendations(user, available_workouts, num_recommendations=10)
+        with instrumentation.span('get_recommendations'):
+            recommended_workouts = rl_agent.get_recommendations(user, available_workouts, num_recommendations=10)
         
         # Calculate diversity score
         diversity_score = rl_agent.get_workout_diversity(recommended_workouts)
@@ -133,19 +239,26 @@ def create_app():
         if 'user_id' not in session:
             return redirect(url_for('login'))
         
-        workout = Workout.query.get_or_404(workout_id)
+        workout = workout_catalog.snapshot().get(workout_id)
+        if workout is None:
+            abort(404)
         user = User.query.get(session['user_id'])
         
-        # Get user's history with this workout
-        workout_history = WorkoutHistory.query.filter_by(
-            user_id=user.id, 
-            workout_id=workout_id
-        ).order_by(WorkoutHistory.date.desc()).all()
+        # One page of the user's history with this workout, plus totals over all of it
+        cursor = request.args.get('cursor')
+        query = WorkoutHistory.query.filter_by(user_id=user.id, workout_id=workout_id)
+        try:
+            workout_history, next_cursor = history_page(query, cursor, page_size(request.args.get('limit', type=int)))
+        except ValueError:
+            abort(400)
         
         return render_template('workout_detail.html', 
                              workout=workout, 
                              user=user,
-                             history=workout_history)
+                             history=workout_history,
+                             summary=history_summary(user.id, workout_id),
+                             cursor=cursor,
+                             next_cursor=next_cursor)
     
     @app.route('/complete_workout/<int:workout_id>', methods=['POST'])
     def complete_workout(workout_id):
@@ -154,7 +267,9 @@ def create_app():
         
         data = request.json
         user = User.query.get(session['user_id'])
-        workout = Workout.query.get_or_404(workout_id)
+        workout = workout_catalog.snapshot().get(workout_id)
+        if workout is None:
+            abort(404)
         
         # Create workout history entry
         history = WorkoutHistory(
@@ -169,19 +284,69 @@ def create_app():
         )
         
         db.session.add(history)
+        feedback_store.record(history, workout)
         db.session.commit()
+        response_cache.invalidate_user(user.id)
         
-        # Update RL model with feedback
+        # Queue the RL model update; the response does not wait for it
         feedback = [
             data.get('enjoyment_rating', 3),
             data.get('difficulty_rating', 3),
             data.get('completion_rate', 1.0),
             data.get('intensity', 7)
         ]
-        rl_agent.update_model(user.id, workout_id, feedback)
+        feedback_queue.submit(instrumentation.timed('update_model', rl_agent.update_model), user.id, workout_id, feedback)
         
         return jsonify({'success': True, 'message': 'Workout completed successfully!'})
     
+    @app.route('/api/completions/bulk', methods=['POST'])
+    def api_bulk_completions():
+        """
+        API endpoint to record many workout completions in one call
+        Accepts a JSON array or JSON lines; a logged-in user may record their own
+        sessions, kiosks send X-API-Key and a user_id on every item
+        """
+        api_key = app.config['API_KEY']
+        trusted = bool(api_key) and request.headers.get('X-API-Key') == api_key
+        if not trusted and 'user_id' not in session:
+            return jsonify({'error': 'Not logged in'}), 401
+        
+        try:
+            items = parse_completions(request.get_data(as_text=True))
+        except ValueError:
+            return jsonify({'error': 'Expected a JSON array or JSON lines'}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} completions per request'}), 413
+        
+        result = bulk_ingester.ingest(items, workout_catalog.snapshot(),
+                                      session_user_id=session.get('user_id'), trusted=trusted)
+        return jsonify(result)
+    
+    @app.route('/api/feedback-queue')
+    def api_feedback_queue():
+        """API endpoint exposing the feedback queue's depth and backpressure counters"""
+        api_key = app.config['API_KEY']
+        if not api_key or request.headers.get('X-API-Key') != api_key:
+            return jsonify({'error': 'Invalid API key'}), 403
+        return jsonify(feedback_queue.stats())
+    
+    @app.route('/api/cache-stats')
+    def api_cache_stats():
+        """API endpoint exposing response cache hit/miss counters"""
+        api_key = app.config['API_KEY']
+        if not api_key or request.headers.get('X-API-Key') != api_key:
+            return jsonify({'error': 'Invalid API key'}), 403
+        return jsonify(response_cache.stats())
+    
+    @app.route('/metrics')
+    def metrics():
+        """Per-route latency, query and span histograms (local requests only)"""
+        if not instrumentation.enabled:
+            abort(404)
+        if request.remote_addr not in ('127.0.0.1', '::1'):
+            abort(403)
+        return jsonify(instrumentation.snapshot())
+    
     @app.route('/profile', methods=['GET', 'POST'])
     def profile():
         if 'user_id' not in session:
@@ -210,6 +375,7 @@ def create_app():
             user.set_preferences(preferences)
             
             db.session.commit()
+            response_cache.invalidate_user(user.id)
             flash('Profile updated successfully!', 'success')
             return redirect(url_for('profile'))
         
@@ -225,13 +391,25 @@ def create_app():
             session.clear()
             return redirect(url_for('login'))
         
-        # Get all workout history
-        history = WorkoutHistory.query.filter_by(user_id=user.id)\
-            .order_by(WorkoutHistory.date.desc()).all()
-        
-        return render_template('history.html', user=user, history=history)
+        # One page of history, joined with each entry's workout in the same query
+        cursor = request.args.get('cursor')
+        query = WorkoutHistory.query.filter_by(user_id=user.id).options(joinedload(WorkoutHistory.workout))
+        try:
+            history, next_cursor = history_page(query, cursor, page_size(request.args.get('limit', type=int)))
+        except ValueError:
+            abort(400)
+        
+        # Totals and the category chart cover the whole history
+        category_counts = {cat: stats.count for cat, stats in feedback_store.get_scope(user.id, 'category').items()}
+        
+        return render_template('history.html', user=user, history=history,
+                             summary=history_summary(user.id),
+                             category_counts=category_counts,
+                             cursor=cursor,
+                             next_cursor=next_cursor)
     
     @app.route('/analytics')
+    @cached_response
     def analytics():
         if 'user_id' not in session:
             return redirect(url_for('login'))
@@ -241,33 +419,28 @@ def create_app():
             session.clear()
             return redirect(url_for('login'))
         
-        # Get user insights
-        insights = rl_agent.get_user_insights(user)
+        # All aggregates in one query, shared by the insights and the charts
+        aggregates = feedback_store.get_user_aggregates(user.id)
         
-        # Get workout history for charts
-        history = WorkoutHistory.query.filter_by(user_id=user.id).all()
+        # Get user insights
+        insights = rl_agent.get_user_insights(user, aggregates)
         
-        # Prepare data for charts
+        # Category and difficulty distributions come from the aggregate store
         chart_data = {
-            'categories': {},
-            'difficulty': {},
+            'categories': {cat: stats.count for cat, stats in aggregates['category'].items()},
+            'difficulty': {diff: stats.count for diff, stats in aggregates['difficulty'].items()},
             'enjoyment_trend': [],
             'completion_trend': []
         }
         
+        # Trend series only need three columns per entry
+        history = db.session.query(
+            WorkoutHistory.date,
+            WorkoutHistory.enjoyment_rating,
+            WorkoutHistory.completion_rate
+        ).filter(WorkoutHistory.user_id == user.id).all()
+        
         for entry in history:
-            workout = entry.workout
-            
-            # Category distribution
-            if workout.category not in chart_data['categories']:
-                chart_data['categories'][workout.category] = 0
-            chart_data['categories'][workout.category] += 1
-            
-            # Difficulty distribution
-            if workout.difficulty not in chart_data['difficulty']:
-                chart_data['difficulty'][workout.difficulty] = 0
-            chart_data['difficulty'][workout.difficulty] += 1
-            
             # Trends over time
             chart_data['enjoyment_trend'].append({
                 'date': entry.date.strftime('%Y-%m-%d'),
@@ -286,20 +459,10 @@ def create_app():
     @app.route('/api/workouts')
     def api_workouts():
         """API endpoint to get all workouts"""
-        workouts = Workout.query.all()
-        return jsonify([{
-            'id': w.id,
-            'name': w.name,
-            'category': w.category,
-            'muscle_group': w.muscle_group,
-            'equipment': w.equipment,
-            'difficulty': w.difficulty,
-            'duration': w.duration,
-            'calories_burn': w.calories_burn,
-            'description': w.description
-        } for w in workouts])
+        return jsonify(workout_catalog.snapshot().summaries)
     
     @app.route('/api/recommendations')
+    @cached_response
     def api_recommendations():
         """API endpoint to get personalized recommendations"""
         if 'user_id' not in session:
@@ -309,8 +472,14 @@ def create_app():
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        available_workouts = Workout.query.all()
-        recommended_workouts = rl_agent.get_recommendations(user, available_workouts, num_recommendations=5)
+        # Optional pagination over the ranked catalog
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 5, type=int)
+        
+        available_workouts = workout_catalog.snapshot()
+        with instrumentation.span('get_recommendations'):
+            recommended_workouts = rl_agent.get_recommendations_page(user, available_workouts,
+                                                                     offset=offset, limit=limit)
         
         return jsonify([{
             'id': w.id,
@@ -324,6 +493,55 @@ def create_app():
             'description': w.description
         } for w in recommended_workouts])
     
+    @app.route('/api/batch-recommendations', methods=['POST'])
+    def api_batch_recommendations():
+        """API endpoint to get recommendations for many users in one call"""
+        api_key = app.config['API_KEY']
+        if not api_key or request.headers.get('X-API-Key') != api_key:
+            return jsonify({'error': 'Invalid API key'}), 403
+        
+        data = request.get_json(silent=True)
+        if isinstance(data, list):
+            data = {'requests': data}
+        if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
+            return jsonify({'error': 'Expected a JSON list of requests'}), 400
+        if len(data['requests']) > MAX_BATCH_REQUESTS:
+            return jsonify({'error': f'At most {MAX_BATCH_REQUESTS} requests per call'}), 413
+        
+        try:
+            requests = validate_requests(data['requests'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        num_recommendations = data.get('num_recommendations', 5)
+        if (not isinstance(num_recommendations, int) or isinstance(num_recommendations, bool)
+                or not 1 <= num_recommendations <= MAX_RECOMMENDATIONS):
+            return jsonify({'error': f'num_recommendations must be an integer between 1 and {MAX_RECOMMENDATIONS}'}), 400
+        return jsonify(batch_service.recommend(requests, num_recommendations))
+    
+    @app.route('/api/history')
+    def api_history():
+        """API endpoint to page through the user's workout history, newest first"""
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not logged in'}), 401
+        
+        query = WorkoutHistory.query.filter_by(user_id=session['user_id'])
+        workout_id = request.args.get('workout_id', type=int)
+        if workout_id is not None:
+            query = query.filter_by(workout_id=workout_id)
+        
+        try:
+            entries, next_cursor = history_page(query.options(joinedload(WorkoutHistory.workout)),
+                                                request.args.get('cursor'),
+                                                page_size(request.args.get('limit', type=int)))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'items': [history_entry_json(entry) for entry in entries],
+            'next_cursor': next_cursor
+        })
+    
     @app.route('/health-input', methods=['GET', 'POST'])
     def health_input():
         """Health input form for enhanced recommendations"""
@@ -345,12 +563,13 @@ def create_app():
             injury_constraints = [injury.strip() for injury in injury_constraints if injury.strip()]
             
             # Get enhanced recommendation
-            recommendation = enhanced_agent.get_recommendation(
-                user, 
-                fatigue_level, 
-                days_since_last, 
-                injury_constraints
-            )
+            with instrumentation.span('get_recommendation'):
+                recommendation = enhanced_agent.get_recommendation(
+                    user, 
+                    fatigue_level, 
+                    days_since_last, 
+                    injury_constraints
+                )
             
             if 'error' in recommendation:
                 flash(recommendation['error'], 'error')
@@ -383,7 +602,7 @@ def create_app():
         recommendation = session['current_recommendation']
         
         # Find the workout
-        workout = Workout.query.filter_by(name=recommendation['workout_name']).first()
+        workout = workout_catalog.snapshot().find_by_name(recommendation['workout_name'])
         if not workout:
             return jsonify({'error': 'Workout not found'}), 404
         
@@ -392,8 +611,8 @@ def create_app():
             user_id=user.id,
             workout_id=workout.id,
             date=datetime.now(),
-            actual_duration=int(data.get('actual_duration', recommendation['duration'])),
-            intensity=data.get('intensity', 'medium'),
+            duration=int(data.get('actual_duration', recommendation['duration'])),
+            intensity=INTENSITY_SCALE.get(data.get('intensity', 'medium'), 6),
             enjoyment_rating=int(data.get('enjoyment_rating', 3)),
             difficulty_rating=int(data.get('difficulty_rating', 3)),
             completion_rate=float(data.get('completion_rate', 1.0)),
@@ -401,19 +620,23 @@ def create_app():
         )
         
         db.session.add(history)
+        feedback_store.record(history, workout)
         db.session.commit()
+        response_cache.invalidate_user(user.id)
         
-        # Update enhanced RL agent
+        # Feedback for the enhanced RL agent, applied by the background consumer
         feedback = {
             'enjoyment': int(data.get('enjoyment_rating', 3)),
             'difficulty': int(data.get('difficulty_rating', 3)),
             'completion': float(data.get('completion_rate', 1.0))
         }
         
-        state = recommendation['state']
+        # The session round-trips the state tuple through JSON as a list
+        state = tuple(recommendation['state'])
         action = recommendation['intensity_level']
         
-        enhanced_agent.update_from_feedback(user, state, action, feedback)
+        feedback_queue.submit(instrumentation.timed('update_from_feedback', enhanced_agent.update_from_feedback),
+                              user, state, action, feedback)
         
         # Clear session
         session.pop('current_recommendation', None)
@@ -436,7 +659,15 @@ def create_app():
     
     # Create database tables
     with app.app_context():
+        instrumentation.init_app(app, db.engine)
         db.create_all()
+        
+        # Add indexes introduced after the tables were first created
+        apply_migrations(db.engine)
+        
+        # Backfill feedback aggregates for databases created before the store existed
+        if feedback_store.is_empty() and WorkoutHistory.query.first() is not None:
+            feedback_store.rebuild()
     
     return app
 
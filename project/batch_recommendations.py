@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Batch recommendations for many users in one call
+Used by the /api/batch-recommendations endpoint and, from the command line,
+by the overnight scheduler that pre-computes next-day plans:
+
+    python -m project.batch_recommendations requests.jsonl -o plans.jsonl
+
+Each input line is a request such as
+{"user_id": 1, "fatigue_level": 4, "days_since_last": 2, "injury_constraints": ["knee"]};
+without health inputs only the ranked bandit recommendations are produced.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from project.models import User
+from project.catalog import WorkoutCatalog, workout_catalog
+from project.rl_agent import WorkoutRecommendationAgent, EnhancedWorkoutRecommendationAgent
+
+# Health input fields that request an enhanced (intensity-aware) recommendation
+HEALTH_FIELDS = ('fatigue_level', 'days_since_last', 'injury_constraints')
+
+# Largest batch and ranking length accepted in one call
+MAX_BATCH_REQUESTS = 5000
+MAX_RECOMMENDATIONS = 50
+
+
+def validate_request(req) -> Dict:
+    """Normalized copy of one request; raises ValueError describing the problem"""
+    if not isinstance(req, dict):
+        raise ValueError('Request must be an object')
+    user_id = req.get('user_id')
+    if not isinstance(user_id, int) or isinstance(user_id, bool):
+        raise ValueError('user_id must be an integer')
+
+    normalized = {'user_id': user_id}
+    for field, low in (('fatigue_level', 1), ('days_since_last', 0)):
+        if field not in req:
+            continue
+        value = req[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < low:
+            raise ValueError(f'{field} must be a number of at least {low}')
+        normalized[field] = int(value)
+
+    if 'injury_constraints' in req:
+        injury_constraints = req['injury_constraints'] or []
+        if isinstance(injury_constraints, str):
+            injury_constraints = injury_constraints.split(',')
+        if not isinstance(injury_constraints, list) or not all(isinstance(injury, str) for injury in injury_constraints):
+            raise ValueError('injury_constraints must be a list of strings')
+        normalized['injury_constraints'] = [injury.strip() for injury in injury_constraints if injury.strip()]
+    return normalized
+
+
+def validate_requests(requests) -> List[Dict]:
+    """Normalized requests; raises ValueError naming the first invalid one"""
+    if not isinstance(requests, list):
+        raise ValueError('Expected a JSON list of requests')
+    if len(requests) > MAX_BATCH_REQUESTS:
+        raise ValueError(f'At most {MAX_BATCH_REQUESTS} requests per call')
+    normalized = []
+    for index, req in enumerate(requests):
+        try:
+            normalized.append(validate_request(req))
+        except ValueError as e:
+            raise ValueError(f'Request {index}: {e}')
+    return normalized
+
+
+class BatchRecommendationService:
+    """
+    Ranks workouts for a list of user requests
+    Requests are processed in chunks: one query loads the chunk's users, one
+    loads their feedback aggregates, and both agents score the chunk at once
+    """
+
+    def __init__(self, rl_agent: WorkoutRecommendationAgent,
+                 enhanced_agent: Optional[EnhancedWorkoutRecommendationAgent] = None,
+                 catalog: WorkoutCatalog = None, chunk_size: int = 1000):
+        self.rl_agent = rl_agent
+        self.enhanced_agent = enhanced_agent
+        self.catalog = catalog or workout_catalog
+        self.chunk_size = chunk_size  # also bounds the ids bound into one IN (...) query
+
+    def recommend(self, requests: List[Dict], num_recommendations: int = 5) -> List[Dict]:
+        """Results in request order for requests checked by validate_requests; unknown users get an error entry"""
+        results = []
+        for start in range(0, len(requests), self.chunk_size):
+            results.extend(self._recommend_chunk(requests[start:start + self.chunk_size], num_recommendations))
+        return results
+
+    def _recommend_chunk(self, requests: List[Dict], num_recommendations: int) -> List[Dict]:
+        available_workouts = self.catalog.snapshot()
+
+        user_ids = {req['user_id'] for req in requests}
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()}
+
+        ranked = self.rl_agent.get_batch_recommendations(list(users.values()), available_workouts,
+                                                         num_recommendations, chunk_size=self.chunk_size)
+
+        # Enhanced recommendations for the requests that carry health inputs
+        health_requests = [i for i, req in enumerate(requests)
+                           if req['user_id'] in users and any(field in req for field in HEALTH_FIELDS)]
+        enhanced = {}
+        if self.enhanced_agent is not None and health_requests:
+            health_inputs = [self._health_input(requests[i], users[requests[i]['user_id']])
+                             for i in health_requests]
+            enhanced = dict(zip(health_requests, self.enhanced_agent.get_batch_recommendations(health_inputs)))
+
+        results = []
+        for i, req in enumerate(requests):
+            user_id = req['user_id']
+            if user_id not in users:
+                results.append({'user_id': user_id, 'error': 'User not found'})
+                continue
+            result = {
+                'user_id': user_id,
+                'recommendations': [available_workouts.summaries[available_workouts.index[w.id]]
+                                    for w in ranked[user_id]]
+            }
+            if i in enhanced:
+                result['enhanced_recommendation'] = enhanced[i]
+            results.append(result)
+        return results
+
+    def _health_input(self, req: Dict, user: User) -> tuple:
+        """(user, fatigue_level, days_since_last, injury_constraints) for the enhanced agent"""
+        return (user, req.get('fatigue_level', 5), req.get('days_since_last', 1), req.get('injury_constraints', []))
+
+
+def read_requests(lines: Iterable[str]) -> List[Dict]:
+    """Parse a JSON array or JSON-lines request file"""
+    text = ''.join(lines).strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Pre-compute workout recommendations for many users')
+    parser.add_argument('requests', nargs='?', help='JSON array or JSON-lines file of requests (default: stdin)')
+    parser.add_argument('-o', '--output', help='JSON-lines output file (default: stdout)')
+    parser.add_argument('--all-users', action='store_true', help='recommend for every user instead of a request file')
+    parser.add_argument('-n', '--num-recommendations', type=int, default=5, choices=range(1, MAX_RECOMMENDATIONS + 1),
+                        metavar=f'1..{MAX_RECOMMENDATIONS}')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    from project.app import create_app
+    app = create_app()
+
+    with app.app_context():
+        if args.all_users:
+            requests = [{'user_id': user_id} for (user_id,) in User.query.with_entities(User.id).order_by(User.id)]
+        elif args.requests:
+            with open(args.requests) as f:
+                requests = read_requests(f)
+        else:
+            requests = read_requests(sys.stdin)
+        try:
+            requests = [validate_request(req) for req in requests]
+        except ValueError as e:
+            parser.error(str(e))
+
+        service = app.extensions['batch_recommendations']
+        service.chunk_size = args.chunk_size
+        results = service.recommend(requests, args.num_recommendations)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in results:
+            output.write(json.dumps(result) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
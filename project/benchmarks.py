@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmarks of the recommendation, feedback and analytics routes
+Each dataset is generated with the scale seeder into a throwaway SQLite
+database, and the app is driven through Flask's test client. Latency
+percentiles, throughput and queries per request are reported for every
+route. Results can be stored as a baseline, and later runs are compared
+with it:
+
+    python -m project.benchmarks --datasets small medium --save-baseline benchmark_baseline.json
+    python -m project.benchmarks --datasets small medium --baseline benchmark_baseline.json
+
+The exit status is 1 when any route regressed beyond the tolerance.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from project.instrumentation import LatencyHistogram
+from project.query_counter import count_queries
+
+# Seeder arguments per dataset size
+DATASETS = {
+    'small': {'num_users': 100, 'num_workouts': 50, 'num_history': 5000},
+    'medium': {'num_users': 2000, 'num_workouts': 200, 'num_history': 100000},
+    'large': {'num_users': 20000, 'num_workouts': 1000, 'num_history': 1000000}
+}
+
+HEALTH_FORM = {'fatigue_level': '4', 'days_since_last': '2', 'injury_constraints': ''}
+
+
+class Scenario:
+    """One route with its request arguments; prepare() runs untimed before each request"""
+
+    def __init__(self, name: str, method: str, path: str, prepare: Optional[Callable] = None, **request_kwargs):
+        self.name = name
+        self.method = method
+        self.path = path  # may contain {workout_id}
+        self.prepare = prepare
+        self.request_kwargs = request_kwargs
+
+
+def _recommend_first(client):
+    """/complete-enhanced-workout needs a recommendation in the session"""
+    client.post('/health-input', data=HEALTH_FORM)
+
+
+SCENARIOS = [
+    Scenario('recommendations', 'GET', '/recommendations'),
+    Scenario('api_recommendations', 'GET', '/api/recommendations'),
+    Scenario('health_input', 'POST', '/health-input', data=HEALTH_FORM),
+    Scenario('complete_workout', 'POST', '/complete_workout/{workout_id}',
+             json={'duration': 30, 'intensity': 6, 'enjoyment_rating': 4,
+                   'difficulty_rating': 3, 'completion_rate': 0.9}),
+    Scenario('complete_enhanced_workout', 'POST', '/complete-enhanced-workout', prepare=_recommend_first,
+             data={'actual_duration': '30', 'intensity': 'medium', 'enjoyment_rating': '4',
+                   'difficulty_rating': '3', 'completion_rate': '0.9'}),
+    Scenario('analytics', 'GET', '/analytics'),
+    Scenario('api_health_progression', 'GET', '/api/health-progression')
+]
+
+
+def run_dataset(name: str, iterations: int = 200, warmup: int = 5, cache: bool = False,
+                seed: int = 42, sample_users: int = 500) -> Dict:
+    """Seed a dataset into a temporary database and benchmark every scenario against it"""
+    from project.app import create_app
+    from project.data_seeder import seed_scale_dataset
+    from project.models import db, User, Workout
+
+    workdir = tempfile.mkdtemp(prefix=f'fitrec-bench-{name}-')
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # the enhanced agent keeps its Q-table files in the working directory
+    try:
+        config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"}
+        if not cache:
+            config['RESPONSE_CACHE_MAX_BYTES'] = 0  # disables the response cache
+        app = create_app(config)
+
+        with app.app_context():
+            seed_scale_dataset(seed=seed, **DATASETS[name])
+            engine = db.engine
+            user_ids = [user_id for (user_id,) in User.query.with_entities(User.id).order_by(User.id)]
+            workout_ids = [workout_id for (workout_id,) in Workout.query.with_entities(Workout.id).order_by(Workout.id)]
+
+        rng = random.Random(seed)
+        user_ids = rng.sample(user_ids, min(sample_users, len(user_ids)))
+        client = app.test_client()
+        feedback_queue = app.extensions['feedback_queue']
+
+        results = {}
+        for scenario in SCENARIOS:
+            latency = LatencyHistogram()
+            queries = LatencyHistogram()
+            errors = 0
+            elapsed_total = 0.0
+            for i in range(warmup + iterations):
+                with client.session_transaction() as session:
+                    session['user_id'] = user_ids[i % len(user_ids)]
+                if scenario.prepare is not None:
+                    scenario.prepare(client)
+                path = scenario.path.format(workout_id=rng.choice(workout_ids))
+
+                with count_queries(engine) as counter:
+                    started = time.perf_counter()
+                    response = client.open(path, method=scenario.method, **scenario.request_kwargs)
+                    elapsed = time.perf_counter() - started
+
+                if i < warmup:
+                    continue
+                latency.record(elapsed * 1e6)
+                queries.record(counter.count)
+                elapsed_total += elapsed
+                if response.status_code >= 400:
+                    errors += 1
+
+            # Updates queued by the feedback routes must not spill into the next scenario
+            feedback_queue.drain()
+
+            results[scenario.name] = {
+                'latency_ms': latency.summary(1000.0),
+                'queries_per_request': queries.summary(),
+                'requests_per_second': iterations / elapsed_total if elapsed_total else 0.0,
+                'errors': errors
+            }
+        feedback_queue.close()
+        return results
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = 0.25, min_delta_ms: float = 1.0) -> List[str]:
+    """
+    Regressions of results against a baseline
+    A route regresses when its p95 latency grows by more than tolerance (and
+    by at least min_delta_ms, to ignore noise on very fast routes), or when
+    it issues more queries per request than before.
+    """
+    regressions = []
+    for dataset, routes in results['datasets'].items():
+        base_routes = baseline.get('datasets', {}).get(dataset, {})
+        for route, current in routes.items():
+            base = base_routes.get(route)
+            if base is None:
+                continue
+            p95, base_p95 = current['latency_ms']['p95'], base['latency_ms']['p95']
+            if p95 > base_p95 * (1 + tolerance) and p95 - base_p95 >= min_delta_ms:
+                regressions.append(f"{dataset}/{route}: p95 {base_p95:.2f} ms -> {p95:.2f} ms")
+            queries, base_queries = current['queries_per_request']['mean'], base['queries_per_request']['mean']
+            if queries > base_queries + 0.5:
+                regressions.append(f"{dataset}/{route}: queries per request {base_queries:.1f} -> {queries:.1f}")
+            if current['errors'] > base['errors']:
+                regressions.append(f"{dataset}/{route}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_report(results: Dict):
+    print(f"{'dataset':8} {'route':27} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8} {'errors':>6}")
+    for dataset, routes in results['datasets'].items():
+        for route, stats in routes.items():
+            latency = stats['latency_ms']
+            print(f"{dataset:8} {route:27} {latency['p50']:8.2f} {latency['p95']:8.2f} {latency['p99']:8.2f} "
+                  f"{stats['requests_per_second']:8.1f} {stats['queries_per_request']['mean']:8.1f} {stats['errors']:6d}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark FitRec AI routes against seeded datasets')
+    parser.add_argument('--datasets', nargs='+', choices=sorted(DATASETS), default=['small', 'medium'])
+    parser.add_argument('-n', '--iterations', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--cache', action='store_true', help='keep the response cache enabled')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='write these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative p95 increase')
+    parser.add_argument('-o', '--output', help='write the full results as JSON')
+    args = parser.parse_args(argv)
+
+    # Paths are resolved up front; each dataset runs in its own temporary directory
+    paths = {key: os.path.abspath(path) if path else None
+             for key, path in (('baseline', args.baseline), ('save_baseline', args.save_baseline),
+                               ('output', args.output))}
+
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'iterations': args.iterations,
+        'cache': args.cache,
+        'datasets': {name: run_dataset(name, args.iterations, args.warmup, args.cache, args.seed)
+                     for name in args.datasets}
+    }
+    print_report(results)
+
+    for key in ('output', 'save_baseline'):
+        if paths[key]:
+            with open(paths[key], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if paths['baseline']:
+        with open(paths['baseline']) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('\nRegressions against the baseline:')
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print('\nNo regressions against the baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
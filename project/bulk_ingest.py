@@ -0,0 +1,154 @@
+import json
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert
+from project.models import db, User, WorkoutHistory
+from project.catalog import CatalogSnapshot
+from project.feedback_store import FeedbackAggregateStore
+from project.feedback_queue import FeedbackQueue
+from project.rl_agent import WorkoutRecommendationAgent
+
+# Accepted fields: (type, default, (min, max)); a default of None means "workout's own value",
+# which is stored as is (possibly NULL) like the single-completion route does
+COMPLETION_FIELDS = {
+    'duration': (int, None, (0, 24 * 60)),
+    'intensity': (int, 7, (1, 10)),
+    'enjoyment_rating': (int, 3, (1, 5)),
+    'difficulty_rating': (int, 3, (1, 5)),
+    'completion_rate': (float, 1.0, (0.0, 1.0))
+}
+
+# Largest batch accepted in one request
+MAX_BATCH_SIZE = 5000
+
+
+def parse_completions(body: str) -> List:
+    """
+    Items of a bulk completion payload: a JSON array, {"completions": [...]}
+    or JSON lines. Raises ValueError when the body is none of these.
+    """
+    text = body.strip()
+    if not text:
+        return []
+    if text[0] in '[{':
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            payload = None  # may still be JSON lines of objects
+        if isinstance(payload, list):
+            return payload
+        if isinstance(payload, dict):
+            if isinstance(payload.get('completions'), list):
+                return payload['completions']
+            return [payload]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class BulkCompletionIngester:
+    """
+    Records a batch of workout completions
+    Valid items are inserted with one executemany and committed once together
+    with their feedback aggregates; the bandit then applies all their updates
+    in one vectorized call (through the feedback queue when one is given).
+    Invalid items are reported and skipped.
+    """
+
+    def __init__(self, rl_agent: WorkoutRecommendationAgent, feedback_store: FeedbackAggregateStore,
+                 feedback_queue: Optional[FeedbackQueue] = None,
+                 on_commit: Optional[Callable[[Iterable[int]], None]] = None):
+        self.rl_agent = rl_agent
+        self.feedback_store = feedback_store
+        self.feedback_queue = feedback_queue
+        self.on_commit = on_commit  # called with the ids of users that got new history
+
+    def ingest(self, items: List, catalog: CatalogSnapshot, session_user_id: Optional[int] = None,
+               trusted: bool = False) -> Dict:
+        """
+        Record items and return {'inserted': n, 'errors': [{'index': i, 'error': ...}]}
+        Untrusted callers may only record their own sessions; trusted callers
+        (kiosks with the API key) must name the user of every item
+        """
+        errors = []
+        valid: List[Tuple[int, Dict]] = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, self._validate(item, catalog, session_user_id, trusted)))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+
+        # Unknown users are only detectable with a query; one covers the whole batch
+        user_ids = {row['user_id'] for _, row in valid}
+        known_users = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+        rows = []
+        for index, row in valid:
+            if row['user_id'] in known_users:
+                rows.append(row)
+            else:
+                errors.append({'index': index, 'error': 'User not found'})
+        errors.sort(key=lambda error: error['index'])
+
+        if rows:
+            db.session.execute(insert(WorkoutHistory), rows)
+            self.feedback_store.record_many([(row['user_id'], self._feedback_vector(row),
+                                              catalog.get(row['workout_id'])) for row in rows])
+            db.session.commit()
+            if self.on_commit is not None:
+                self.on_commit({row['user_id'] for row in rows})
+
+            workout_ids = [row['workout_id'] for row in rows]
+            feedback = [self._feedback_vector(row) for row in rows]
+            if self.feedback_queue is not None:
+                self.feedback_queue.submit(self.rl_agent.update_model_batch, workout_ids, feedback)
+            else:
+                self.rl_agent.update_model_batch(workout_ids, feedback)
+
+        return {'inserted': len(rows), 'errors': errors}
+
+    def _validate(self, item, catalog: CatalogSnapshot, session_user_id: Optional[int], trusted: bool) -> Dict:
+        """WorkoutHistory column values of one item; raises ValueError describing the problem"""
+        if not isinstance(item, dict):
+            raise ValueError('Item must be an object')
+
+        user_id = item.get('user_id', None if trusted else session_user_id)
+        if not isinstance(user_id, int) or isinstance(user_id, bool):
+            raise ValueError('user_id must be an integer')
+        if not trusted and user_id != session_user_id:
+            raise ValueError('Not allowed to record workouts for another user')
+
+        workout_id = item.get('workout_id')
+        if not isinstance(workout_id, int) or isinstance(workout_id, bool):
+            raise ValueError('workout_id must be an integer')
+        workout = catalog.get(workout_id)
+        if workout is None:
+            raise ValueError(f'Workout {workout_id} not found')
+
+        row = {'user_id': user_id, 'workout_id': workout_id}
+        for field, (kind, default, (low, high)) in COMPLETION_FIELDS.items():
+            if field not in item and default is None:
+                row[field] = getattr(workout, field)
+                continue
+            value = item.get(field, default)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'{field} must be a number')
+            if not low <= value <= high:
+                raise ValueError(f'{field} must be between {low} and {high}')
+            row[field] = kind(value)
+
+        date = item.get('date')
+        try:
+            row['date'] = datetime.fromisoformat(date) if date is not None else datetime.utcnow()
+        except (TypeError, ValueError):
+            raise ValueError('date must be an ISO 8601 timestamp')
+        if row['date'].tzinfo is not None:
+            # Stored dates are naive UTC (datetime.utcnow()), so sorting and cursors compare like with like
+            row['date'] = row['date'].astimezone(timezone.utc).replace(tzinfo=None)
+
+        notes = item.get('notes', '')
+        if not isinstance(notes, str):
+            raise ValueError('notes must be a string')
+        row['notes'] = notes
+        return row
+
+    def _feedback_vector(self, row: Dict) -> List[float]:
+        """Same order as WorkoutHistory.get_feedback_vector()"""
+        return [row['enjoyment_rating'], row['difficulty_rating'], row['completion_rate'], row['intensity']]
@@ -0,0 +1,125 @@
+import threading
+import numpy as np
+from collections import namedtuple
+from typing import List, Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from project.models import db, Workout
+
+# Immutable, attribute-compatible stand-in for a Workout row
+WorkoutRecord = namedtuple('WorkoutRecord', [column.name for column in Workout.__table__.columns])
+
+# Fields exposed by the JSON workout endpoints
+SUMMARY_FIELDS = ('id', 'name', 'category', 'muscle_group', 'equipment', 'difficulty',
+                  'duration', 'calories_burn', 'description')
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the workout catalog at one version
+    Behaves like a read-only sequence of WorkoutRecord and carries
+    precomputed feature arrays aligned with that ordering
+    """
+
+    def __init__(self, version: int, workouts: Sequence[WorkoutRecord]):
+        self.version = version
+        self.workouts = tuple(workouts)
+        self.index = {workout.id: position for position, workout in enumerate(self.workouts)}
+        self.name_index = {}
+        for position, workout in enumerate(self.workouts):
+            self.name_index.setdefault(workout.name, position)
+
+        # Feature arrays aligned with self.workouts
+        self.ids = np.array([w.id for w in self.workouts], dtype=np.int64)
+        self.categories = np.array([w.category for w in self.workouts], dtype=object)
+        self.difficulties = np.array([w.difficulty for w in self.workouts], dtype=object)
+        self.equipment = np.array([w.equipment for w in self.workouts], dtype=object)
+        self.durations = np.array([w.duration or 0 for w in self.workouts], dtype=np.int64)
+        self.calories = np.array([w.calories_burn or 0 for w in self.workouts], dtype=np.int64)
+
+        # Pre-serialized payload for the JSON workout endpoints
+        self.summaries = [{field: getattr(w, field) for field in SUMMARY_FIELDS} for w in self.workouts]
+
+    def __len__(self) -> int:
+        return len(self.workouts)
+
+    def __iter__(self):
+        return iter(self.workouts)
+
+    def __getitem__(self, position):
+        return self.workouts[position]
+
+    def get(self, workout_id: int) -> Optional[WorkoutRecord]:
+        """Look up a workout by id"""
+        position = self.index.get(workout_id)
+        return self.workouts[position] if position is not None else None
+
+    def find_by_name(self, name: str) -> Optional[WorkoutRecord]:
+        """Look up the first workout with the given name"""
+        position = self.name_index.get(name)
+        return self.workouts[position] if position is not None else None
+
+
+class WorkoutCatalog:
+    """
+    Process-wide cache of the workout catalog
+    The snapshot is rebuilt lazily after the version counter moves, which
+    happens whenever a session commits Workout inserts, updates or deletes.
+    Writes from other processes (e.g. data_seeder) need an explicit invalidate().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        """Discard the current snapshot"""
+        with self._lock:
+            self._version += 1
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Current catalog snapshot, loaded from the database if stale"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                self._snapshot = CatalogSnapshot(self._version, self._load_records())
+            return self._snapshot
+
+    def _load_records(self) -> List[WorkoutRecord]:
+        """Load catalog rows as plain tuples, skipping ORM hydration"""
+        rows = db.session.query(*Workout.__table__.columns).order_by(Workout.id).all()
+        return [WorkoutRecord(*row) for row in rows]
+
+
+# Shared by the agents and routes of every app in this process
+workout_catalog = WorkoutCatalog()
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_catalog_writes(session, flush_context):
+    """Remember that this transaction wrote Workout rows"""
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Workout):
+            session.info['workout_catalog_dirty'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_catalog(session):
+    """Invalidate the catalog once Workout writes are committed"""
+    if session.info.pop('workout_catalog_dirty', False):
+        workout_catalog.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_writes(session):
+    """Forget pending Workout writes of a rolled back transaction"""
+    session.info.pop('workout_catalog_dirty', None)
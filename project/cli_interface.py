@@ -9,6 +9,7 @@ import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import json
+from sqlalchemy.orm import joinedload
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -227,6 +228,7 @@ class FitRecCLI:
         with self.app.app_context():
             # Get user's recent workouts
             recent_workouts = WorkoutHistory.query.filter_by(user_id=self.current_user.id)\
+                .options(joinedload(WorkoutHistory.workout))\
                 .order_by(WorkoutHistory.date.desc()).limit(5).all()
             
             if not recent_workouts:
@@ -318,20 +320,24 @@ class FitRecCLI:
         print("\n📊 Workout History")
         
         with self.app.app_context():
-            history = WorkoutHistory.query.filter_by(user_id=self.current_user.id)\
-                .order_by(WorkoutHistory.date.desc()).all()
+            total_workouts = WorkoutHistory.query.filter_by(user_id=self.current_user.id).count()
             
-            if not history:
+            if not total_workouts:
                 print("❌ No workout history found.")
                 return
             
-            print(f"\nTotal workouts: {len(history)}")
+            # Only the rows that are shown, with their workouts in the same query
+            history = WorkoutHistory.query.filter_by(user_id=self.current_user.id)\
+                .options(joinedload(WorkoutHistory.workout))\
+                .order_by(WorkoutHistory.date.desc()).limit(10).all()
+            
+            print(f"\nTotal workouts: {total_workouts}")
             print("\nRecent workouts:")
             print("-" * 80)
             print(f"{'Date':<12} {'Workout':<20} {'Category':<12} {'Duration':<10} {'Enjoyment':<10} {'Difficulty':<10}")
             print("-" * 80)
             
-            for entry in history[:10]:  # Show last 10 workouts
+            for entry in history:  # Show last 10 workouts
                 print(f"{entry.date.strftime('%Y-%m-%d'):<12} "
                       f"{entry.workout.name:<20} "
                       f"{entry.workout.category:<12} "
@@ -1,5 +1,11 @@
-from project.models import db, Workout, User
-from datetime import datetime
+from project.models import db, Workout, User, WorkoutHistory
+from project.feedback_store import FeedbackAggregateStore
+from project.catalog import workout_catalog
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+import numpy as np
+import json
 
 def seed_workouts():
     """Seed the database with sample workouts"""
@@ -288,15 +294,213 @@ def seed_sample_workout_history():
             db.session.add(history)
     
     db.session.commit()
+    
+    # Seeded rows bypass the request handlers, so rebuild the aggregates
+    FeedbackAggregateStore().rebuild()
     print("Seeded sample workout history")
 
+# Synthetic dataset vocabulary for the scale seeder
+SCALE_CATEGORIES = ['strength', 'cardio', 'flexibility', 'hiit']
+SCALE_MUSCLE_GROUPS = ['chest', 'back', 'legs', 'shoulders', 'arms', 'core', 'full body']
+SCALE_EQUIPMENT = ['bodyweight', 'dumbbells', 'barbell', 'kettlebell', 'machine', 'yoga mat', 'cardio']
+SCALE_MOVEMENTS = ['Squat', 'Lunge', 'Deadlift', 'Press', 'Row', 'Jump', 'Twist', 'Plank', 'Run', 'Stretch']
+SCALE_DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+SCALE_GOALS = ['weight_loss', 'muscle_gain', 'endurance', 'flexibility', 'strength']
+
+# Users generated per random stream, so output does not depend on batch_size
+SCALE_USER_BLOCK = 10000
+
+# SQLite settings for bulk loads; the data can be regenerated from the seed
+SQLITE_BULK_PRAGMAS = {'synchronous': 'OFF', 'journal_mode': 'MEMORY'}
+
+@contextmanager
+def _bulk_load_connection():
+    """
+    One connection held for a whole bulk load
+    PRAGMAs are per connection, so they are set on this one and restored
+    before it goes back to the pool
+    """
+    db.session.commit()  # release the session's connection so the load can take the write lock
+    with db.engine.connect() as connection:
+        previous = {}
+        if db.engine.dialect.name == 'sqlite':
+            for name, value in SQLITE_BULK_PRAGMAS.items():
+                previous[name] = connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                connection.exec_driver_sql(f'PRAGMA {name} = {value}')
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            for name, value in previous.items():
+                connection.exec_driver_sql(f'PRAGMA {name} = {value}')
+
+def _insert_batches(connection, table, rows_iter, batch_size):
+    """Insert dict rows with executemany batches, committing each batch"""
+    batch = []
+    inserted = 0
+    for row in rows_iter:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            connection.execute(table.insert(), batch)
+            connection.commit()
+            inserted += len(batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+        connection.commit()
+        inserted += len(batch)
+    return inserted
+
+def seed_scale_dataset(num_users=10000, num_workouts=200, num_history=500000, activity_exponent=1.2,
+                       popularity_exponent=1.0, seed=42, batch_size=50000, days=365,
+                       end_date=datetime(2025, 1, 1)):
+    """
+    Seed a large synthetic dataset for benchmarking and capacity planning
+    Per-user activity follows a power law (Pareto weights with the given
+    exponent, most users train rarely and a few very often) and workout
+    popularity follows a Zipf law. Rows are written with core insert()
+    executemany batches; the same arguments always produce the same data.
+    """
+    root = np.random.SeedSequence(seed)
+    workout_seq, user_seq, activity_seq, history_seq = root.spawn(4)
+    
+    with _bulk_load_connection() as connection:
+        # Explicit ids keep history rows deterministic when tables already hold data
+        first_workout_id = (connection.execute(select(func.max(Workout.id))).scalar() or 0) + 1
+        first_user_id = (connection.execute(select(func.max(User.id))).scalar() or 0) + 1
+    
+        # Workouts
+        rng = np.random.default_rng(workout_seq)
+        difficulties = rng.integers(0, len(SCALE_DIFFICULTIES), num_workouts)
+        durations = rng.integers(10, 61, num_workouts)
+    
+        def workout_rows():
+            for i in range(num_workouts):
+                category = SCALE_CATEGORIES[i % len(SCALE_CATEGORIES)]
+                yield {
+                    'id': first_workout_id + i,
+                    'name': f"{SCALE_MOVEMENTS[i % len(SCALE_MOVEMENTS)]} {category.title()} {i}",
+                    'category': category,
+                    'muscle_group': SCALE_MUSCLE_GROUPS[(i // len(SCALE_CATEGORIES)) % len(SCALE_MUSCLE_GROUPS)],
+                    'equipment': SCALE_EQUIPMENT[(i * 7) % len(SCALE_EQUIPMENT)],
+                    'difficulty': SCALE_DIFFICULTIES[difficulties[i]],
+                    'duration': int(durations[i]),
+                    'calories_burn': int(durations[i]) * (4 + int(difficulties[i]) * 3),
+                    'description': f"Synthetic {category} workout",
+                    'instructions': 'Generated by the scale seeder'
+                }
+    
+        _insert_batches(connection, Workout.__table__, workout_rows(), batch_size)
+        workout_catalog.invalidate()
+        print(f"Seeded {num_workouts} workouts")
+    
+        # Users
+        rng = np.random.default_rng(user_seq)
+        ages = rng.integers(18, 71, num_users)
+        levels = rng.integers(0, len(SCALE_DIFFICULTIES), num_users)
+        genders = rng.integers(0, 2, num_users)
+        weights = np.round(rng.normal(72, 12, num_users).clip(45, 140), 1)
+        heights = np.round(rng.normal(172, 9, num_users).clip(145, 205), 1)
+        goal_pairs = rng.integers(0, len(SCALE_GOALS), (num_users, 2))
+        equipment_picks = rng.integers(0, len(SCALE_EQUIPMENT), (num_users, 2))
+    
+        def user_rows():
+            for i in range(num_users):
+                user_id = first_user_id + i
+                goals = sorted({SCALE_GOALS[g] for g in goal_pairs[i]})
+                equipment = sorted({SCALE_EQUIPMENT[e] for e in equipment_picks[i]})
+                yield {
+                    'id': user_id,
+                    'username': f"user{user_id}",
+                    'email': f"user{user_id}@example.com",
+                    'age': int(ages[i]),
+                    'gender': 'female' if genders[i] else 'male',
+                    'weight': float(weights[i]),
+                    'height': float(heights[i]),
+                    'fitness_level': SCALE_DIFFICULTIES[levels[i]],
+                    'goals': ','.join(goals),
+                    'preferences': json.dumps({'equipment': equipment, 'preferred_duration': 30,
+                                               'time_of_day': 'morning'}),
+                    'created_at': end_date - timedelta(days=days)
+                }
+    
+        _insert_batches(connection, User.__table__, user_rows(), batch_size)
+        print(f"Seeded {num_users} users")
+    
+        # History: power-law activity per user, Zipf popularity per workout
+        rng = np.random.default_rng(activity_seq)
+        activity = rng.pareto(activity_exponent, num_users) + 1.0
+        entries_per_user = rng.multinomial(num_history, activity / activity.sum())
+        popularity = 1.0 / np.arange(1, num_workouts + 1) ** popularity_exponent
+        popularity = popularity[rng.permutation(num_workouts)]
+        popularity /= popularity.sum()
+    
+        block_seqs = history_seq.spawn((num_users + SCALE_USER_BLOCK - 1) // SCALE_USER_BLOCK)
+    
+        def history_rows():
+            for block, block_seq in enumerate(block_seqs):
+                rng = np.random.default_rng(block_seq)
+                start = block * SCALE_USER_BLOCK
+                counts = entries_per_user[start:start + SCALE_USER_BLOCK]
+                size = int(counts.sum())
+                if not size:
+                    continue
+            
+                user_positions = np.repeat(np.arange(start, start + len(counts)), counts)
+                workout_positions = rng.choice(num_workouts, size=size, p=popularity)
+                seconds = rng.integers(0, days * 86400, size)
+            
+                # Ratings loosely follow how well the workout matches the user's level
+                gap = difficulties[workout_positions] - levels[user_positions]
+                enjoyment = np.clip(np.rint(rng.normal(3.8 - 0.4 * np.abs(gap), 0.9)), 1, 5).astype(int)
+                difficulty = np.clip(np.rint(rng.normal(3 + gap, 0.8)), 1, 5).astype(int)
+                completion = np.round(rng.beta(8 - np.clip(gap, 0, 2) * 2, 2), 2)
+                intensity = np.clip(rng.integers(3, 9, size) + gap, 1, 10)
+                duration = np.clip(durations[workout_positions] + rng.integers(-5, 11, size), 5, None)
+            
+                for j in range(size):
+                    yield {
+                        'user_id': first_user_id + int(user_positions[j]),
+                        'workout_id': first_workout_id + int(workout_positions[j]),
+                        'date': end_date - timedelta(seconds=int(seconds[j])),
+                        'duration': int(duration[j]),
+                        'intensity': int(intensity[j]),
+                        'enjoyment_rating': int(enjoyment[j]),
+                        'difficulty_rating': int(difficulty[j]),
+                        'completion_rate': float(completion[j]),
+                        'notes': ''
+                    }
+    
+        inserted = _insert_batches(connection, WorkoutHistory.__table__, history_rows(), batch_size)
+        print(f"Seeded {inserted} workout history entries")
+    
+    # Rows were inserted in bulk, so rebuild the aggregates in one pass
+    FeedbackAggregateStore().rebuild()
+    print("Rebuilt feedback aggregates")
+
 if __name__ == "__main__":
+    import argparse
     from app import create_app
-    from datetime import timedelta
+    
+    parser = argparse.ArgumentParser(description='Seed the FitRec AI database')
+    parser.add_argument('--scale', action='store_true', help='generate a large synthetic dataset instead of the samples')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--workouts', type=int, default=200)
+    parser.add_argument('--history', type=int, default=500000, help='total workout history rows')
+    parser.add_argument('--activity-exponent', type=float, default=1.2,
+                        help='Pareto exponent of per-user activity (lower = heavier tail)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
     
     app = create_app()
     with app.app_context():
-        seed_workouts()
-        seed_sample_users()
-        seed_sample_workout_history()
+        if args.scale:
+            seed_scale_dataset(num_users=args.users, num_workouts=args.workouts, num_history=args.history,
+                               activity_exponent=args.activity_exponent, seed=args.seed,
+                               batch_size=args.batch_size)
+        else:
+            seed_workouts()
+            seed_sample_users()
+            seed_sample_workout_history()
         print("Database seeding completed!")
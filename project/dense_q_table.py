@@ -0,0 +1,59 @@
+import numpy as np
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from project.state_codec import HealthStateCodec
+
+
+class DenseQTable:
+    """
+    Q-matrix of shape (num_states, num_actions) indexed by HealthStateCodec
+    Unvisited states are zero rows, matching the zero-initialised dict entries
+    the agent used to create on first access
+    """
+
+    def __init__(self, codec: HealthStateCodec, values: Optional[np.ndarray] = None):
+        self.codec = codec
+        if values is None:
+            values = np.zeros(codec.shape, dtype=np.float64)
+        self.values = values
+
+    def get_row(self, state_index: int) -> Dict[str, float]:
+        """Q-values of every action for a state"""
+        row = self.values[state_index]
+        return {action: float(row[i]) for i, action in enumerate(self.codec.actions)}
+
+    def best_action(self, state_index: int, available_actions: List[str]) -> str:
+        """Highest-valued available action; ties go to the first one listed"""
+        columns = [self.codec.action_index(action) for action in available_actions]
+        return available_actions[int(np.argmax(self.values[state_index, columns]))]
+
+    def best_actions(self) -> np.ndarray:
+        """Greedy action index for every state in a single argmax"""
+        return np.argmax(self.values, axis=1)
+
+    def update(self, state_index: int, action_index: int, reward: float, learning_rate: float,
+               discount_factor: float, next_state_index: Optional[int] = None) -> float:
+        """Apply one Q-learning update in place and return the new value"""
+        with self._locked():
+            max_next_q = 0.0
+            if next_state_index is not None:
+                max_next_q = float(self.values[next_state_index].max())
+            current_q = float(self.values[state_index, action_index])
+            new_q = current_q + learning_rate * (reward + discount_factor * max_next_q - current_q)
+            self.values[state_index, action_index] = new_q
+        return new_q
+
+    def load_dict(self, q_table: Dict):
+        """Copy a legacy dict-of-dicts Q-table into the matrix"""
+        for state, action_values in q_table.items():
+            try:
+                state_index = self.codec.encode(state)
+            except KeyError:
+                continue
+            for action, value in action_values.items():
+                if action in self.codec.actions:
+                    self.values[state_index, self.codec.action_index(action)] = value
+
+    def _locked(self):
+        return nullcontext()
@@ -0,0 +1,132 @@
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+
+class FeedbackQueue:
+    """
+    Bounded in-process work queue for model updates
+    Requests enqueue update_model / update_from_feedback calls and return; a
+    background consumer thread applies them in submission order. When the
+    queue is full, submit() waits up to put_timeout and then runs the update
+    inline, so feedback is never dropped and a slow consumer pushes back on
+    the requests producing it.
+    """
+
+    def __init__(self, capacity: int = 1000, put_timeout: float = 0.05):
+        self.capacity = capacity
+        self.put_timeout = put_timeout  # seconds to wait for room before running inline
+
+        self._tasks: Deque[Tuple[Callable, tuple, dict, float]] = deque()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._apply_lock = threading.Lock()  # inline and background updates never overlap
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Backpressure metrics
+        self._submitted = 0
+        self._processed = 0
+        self._failed = 0
+        self._inline = 0
+        self._dequeued = 0
+        self._max_depth = 0
+        self._total_wait = 0.0
+
+    def submit(self, func: Callable, *args, **kwargs) -> bool:
+        """Queue func(*args, **kwargs); returns False if it had to run inline"""
+        deadline = time.monotonic() + self.put_timeout
+        with self._condition:
+            while not self._closed and len(self._tasks) >= self.capacity:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            if not self._closed and len(self._tasks) < self.capacity:
+                self._tasks.append((func, args, kwargs, time.monotonic()))
+                self._submitted += 1
+                self._max_depth = max(self._max_depth, len(self._tasks))
+                if self._thread is None:
+                    self._start()
+                self._condition.notify_all()
+                return True
+
+            # Queue full or closed (interpreter shutdown): apply on the caller's thread
+            self._inline += 1
+        self._apply(func, args, kwargs)
+        return False
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='feedback-consumer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        """Background consumer loop"""
+        while True:
+            with self._condition:
+                while not self._tasks and not self._closed:
+                    self._condition.wait()
+                if not self._tasks:
+                    return
+                func, args, kwargs, enqueued_at = self._tasks.popleft()
+                self._in_flight = 1
+                self._dequeued += 1
+                self._total_wait += time.monotonic() - enqueued_at
+                self._condition.notify_all()
+
+            self._apply(func, args, kwargs)
+
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def _apply(self, func: Callable, args: tuple, kwargs: dict):
+        try:
+            with self._apply_lock:
+                func(*args, **kwargs)
+        except Exception as e:
+            with self._condition:
+                self._failed += 1
+            print(f"Error applying feedback update: {e}")
+        else:
+            with self._condition:
+                self._processed += 1
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Block until every queued update has been applied; False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._tasks or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Apply queued updates and stop the consumer (registered with atexit)"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """Queue depth and throughput counters"""
+        with self._condition:
+            return {
+                'capacity': self.capacity,
+                'depth': len(self._tasks),
+                'max_depth': self._max_depth,
+                'submitted': self._submitted,
+                'processed': self._processed,
+                'failed': self._failed,
+                'ran_inline': self._inline,
+                'average_wait_ms': 1000.0 * self._total_wait / self._dequeued if self._dequeued else 0.0
+            }
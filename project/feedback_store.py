@@ -0,0 +1,252 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import String, bindparam, case, cast, delete, func, insert, literal, select, update
+from project.models import db, FeedbackAggregate, Workout, WorkoutHistory
+from project.scoring import weighted_scores
+
+# Feedback dimensions in WorkoutHistory.get_feedback_vector() order
+FEEDBACK_DIMENSIONS = ('enjoyment', 'difficulty', 'completion', 'intensity')
+
+# Aggregation scopes kept per user
+SCOPES = ('user', 'workout', 'category', 'difficulty')
+
+_HISTORY_COLUMNS = {
+    'enjoyment': WorkoutHistory.enjoyment_rating,
+    'difficulty': WorkoutHistory.difficulty_rating,
+    'completion': WorkoutHistory.completion_rate,
+    'intensity': WorkoutHistory.intensity
+}
+
+
+class FeedbackStats:
+    """Read-only view of one aggregate row"""
+
+    __slots__ = ('count', 'rated_count', 'sums', 'sq_sums', 'last_enjoyment')
+
+    def __init__(self, count: int, rated_count: int, sums: np.ndarray, sq_sums: np.ndarray,
+                 last_enjoyment: Optional[float] = None):
+        self.count = count
+        self.rated_count = rated_count
+        self.sums = sums
+        self.sq_sums = sq_sums
+        self.last_enjoyment = last_enjoyment
+
+    @classmethod
+    def from_row(cls, row: FeedbackAggregate) -> 'FeedbackStats':
+        sums = np.array([getattr(row, f'{dim}_sum') for dim in FEEDBACK_DIMENSIONS], dtype=np.float64)
+        sq_sums = np.array([getattr(row, f'{dim}_sq_sum') for dim in FEEDBACK_DIMENSIONS], dtype=np.float64)
+        return cls(row.count, row.rated_count, sums, sq_sums, row.last_enjoyment)
+
+    def mean(self, dimension: str) -> float:
+        """Mean of a feedback dimension"""
+        if not self.count:
+            return 0.0
+        return float(self.sums[FEEDBACK_DIMENSIONS.index(dimension)] / self.count)
+
+    def weighted_sum(self, weights: List[float]) -> float:
+        """Sum of the weighted feedback scores of every entry"""
+        return float(weighted_scores(self.sums[np.newaxis, :], weights)[0])
+
+
+class FeedbackAggregateStore:
+    """
+    Incrementally maintained feedback aggregates keyed by (user, workout),
+    (user, category) and (user, difficulty), plus a per-user total
+    Replaces full WorkoutHistory rescans on read paths
+    """
+
+    def record(self, history: WorkoutHistory, workout: Workout):
+        """
+        Add a history entry to the user's aggregates
+        Changes join the current session and are committed with the history row
+        """
+        feedback = history.get_feedback_vector()
+        rated = 1 if feedback[0] > 0 else 0
+
+        for scope, key in self._keys_for(workout):
+            increments = {
+                'count': FeedbackAggregate.count + 1,
+                'rated_count': FeedbackAggregate.rated_count + rated
+            }
+            for dim, value in zip(FEEDBACK_DIMENSIONS, feedback):
+                increments[f'{dim}_sum'] = getattr(FeedbackAggregate, f'{dim}_sum') + value
+                increments[f'{dim}_sq_sum'] = getattr(FeedbackAggregate, f'{dim}_sq_sum') + value * value
+            if scope == 'workout':
+                increments['last_enjoyment'] = feedback[0]
+
+            result = db.session.execute(
+                update(FeedbackAggregate)
+                .where(FeedbackAggregate.user_id == history.user_id,
+                       FeedbackAggregate.scope == scope,
+                       FeedbackAggregate.key == key)
+                .values(**increments)
+                .execution_options(synchronize_session=False)
+            )
+
+            if result.rowcount == 0:
+                row = FeedbackAggregate(user_id=history.user_id, scope=scope, key=key,
+                                        count=1, rated_count=rated)
+                if scope == 'workout':
+                    row.last_enjoyment = feedback[0]
+                for dim, value in zip(FEEDBACK_DIMENSIONS, feedback):
+                    setattr(row, f'{dim}_sum', value)
+                    setattr(row, f'{dim}_sq_sum', value * value)
+                db.session.add(row)
+
+    def record_many(self, entries: Sequence[Tuple[int, List[float], Workout]]):
+        """
+        Add many (user_id, feedback_vector, workout) entries to the aggregates
+        Deltas are summed per aggregate row first, then applied with one
+        executemany UPDATE and one executemany INSERT in the current session
+        """
+        counters = ['count', 'rated_count']
+        for dim in FEEDBACK_DIMENSIONS:
+            counters += [f'{dim}_sum', f'{dim}_sq_sum']
+
+        deltas = {}
+        for user_id, feedback, workout in entries:
+            rated = 1 if feedback[0] > 0 else 0
+            for scope, key in self._keys_for(workout):
+                delta = deltas.get((user_id, scope, key))
+                if delta is None:
+                    delta = deltas[(user_id, scope, key)] = dict.fromkeys(counters, 0)
+                    delta['last_enjoyment'] = None
+                delta['count'] += 1
+                delta['rated_count'] += rated
+                for dim, value in zip(FEEDBACK_DIMENSIONS, feedback):
+                    delta[f'{dim}_sum'] += value
+                    delta[f'{dim}_sq_sum'] += value * value
+                if scope == 'workout':
+                    delta['last_enjoyment'] = feedback[0]
+        if not deltas:
+            return
+
+        existing = {(row.user_id, row.scope, row.key): row.id for row in db.session.query(
+            FeedbackAggregate.id, FeedbackAggregate.user_id, FeedbackAggregate.scope, FeedbackAggregate.key
+        ).filter(FeedbackAggregate.user_id.in_({user_id for user_id, _, _ in deltas}))}
+
+        table = FeedbackAggregate.__table__
+        updates, inserts = [], []
+        for (user_id, scope, key), delta in deltas.items():
+            aggregate_id = existing.get((user_id, scope, key))
+            if aggregate_id is None:
+                inserts.append(dict(delta, user_id=user_id, scope=scope, key=key))
+            else:
+                params = {f'delta_{column}': value for column, value in delta.items()}
+                params['aggregate_id'] = aggregate_id
+                updates.append(params)
+
+        if updates:
+            increments = {column: table.c[column] + bindparam(f'delta_{column}') for column in counters}
+            increments['last_enjoyment'] = func.coalesce(bindparam('delta_last_enjoyment'), table.c.last_enjoyment)
+            db.session.execute(table.update().where(table.c.id == bindparam('aggregate_id')).values(**increments),
+                               updates)
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+
+    def _keys_for(self, workout: Workout) -> List[Tuple[str, str]]:
+        """Aggregate keys touched by one history entry"""
+        return [
+            ('user', ''),
+            ('workout', str(workout.id)),
+            ('category', workout.category or ''),
+            ('difficulty', workout.difficulty or '')
+        ]
+
+    def get_user_aggregates(self, user_id: int) -> Dict[str, Dict[str, FeedbackStats]]:
+        """All aggregates of a user in one query: scope -> key -> stats"""
+        aggregates = {scope: {} for scope in SCOPES}
+        rows = FeedbackAggregate.query.filter_by(user_id=user_id).order_by(FeedbackAggregate.id).all()
+        for row in rows:
+            if row.count > 0:
+                aggregates.setdefault(row.scope, {})[row.key] = FeedbackStats.from_row(row)
+        return aggregates
+
+    def get_scope(self, user_id: int, scope: str) -> Dict[str, FeedbackStats]:
+        """Aggregates of a user for one scope: key -> stats"""
+        rows = FeedbackAggregate.query.filter_by(user_id=user_id, scope=scope)\
+            .order_by(FeedbackAggregate.id).all()
+        return {row.key: FeedbackStats.from_row(row) for row in rows if row.count > 0}
+
+    def get_workout_stats(self, user_id: int) -> Dict[int, FeedbackStats]:
+        """Per-workout aggregates of a user keyed by workout id"""
+        return {int(key): stats for key, stats in self.get_scope(user_id, 'workout').items()}
+
+    def get_workout_arrays(self, user_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Per-workout aggregates of many users in one query
+        Returns aligned (user_ids, workout_ids, counts, sums) arrays, with sums
+        holding one column per feedback dimension. Callers chunk user_ids to
+        stay under the database's bound-parameter limit.
+        """
+        sum_columns = [getattr(FeedbackAggregate, f'{dim}_sum') for dim in FEEDBACK_DIMENSIONS]
+        rows = db.session.query(FeedbackAggregate.user_id, FeedbackAggregate.key,
+                                FeedbackAggregate.count, *sum_columns)\
+            .filter(FeedbackAggregate.scope == 'workout',
+                    FeedbackAggregate.user_id.in_(list(user_ids)),
+                    FeedbackAggregate.count > 0)\
+            .order_by(FeedbackAggregate.id).all()
+
+        num_rows = len(rows)
+        return (np.fromiter((row[0] for row in rows), dtype=np.int64, count=num_rows),
+                np.fromiter((int(row[1]) for row in rows), dtype=np.int64, count=num_rows),
+                np.fromiter((row[2] for row in rows), dtype=np.int64, count=num_rows),
+                np.array([row[3:] for row in rows], dtype=np.float64).reshape(num_rows, len(FEEDBACK_DIMENSIONS)))
+
+    def is_empty(self) -> bool:
+        """Check whether no aggregates have been built yet"""
+        return db.session.query(FeedbackAggregate.id).first() is None
+
+    def rebuild(self, user_id: int = None):
+        """
+        Rebuild aggregates from WorkoutHistory with GROUP BY queries
+        Used to backfill existing databases and after bulk imports
+        """
+        clear = delete(FeedbackAggregate)
+        if user_id is not None:
+            clear = clear.where(FeedbackAggregate.user_id == user_id)
+        db.session.execute(clear)
+
+        key_columns = {
+            'user': literal(''),
+            'workout': cast(WorkoutHistory.workout_id, String),
+            'category': func.coalesce(Workout.category, ''),
+            'difficulty': func.coalesce(Workout.difficulty, '')
+        }
+
+        target_columns = ['user_id', 'scope', 'key', 'count', 'rated_count']
+        for dim in FEEDBACK_DIMENSIONS:
+            target_columns += [f'{dim}_sum', f'{dim}_sq_sum']
+
+        for scope, key_column in key_columns.items():
+            columns = [
+                WorkoutHistory.user_id,
+                literal(scope),
+                key_column,
+                func.count(),
+                func.sum(case((func.coalesce(WorkoutHistory.enjoyment_rating, 0) > 0, 1), else_=0))
+            ]
+            for dim in FEEDBACK_DIMENSIONS:
+                value = func.coalesce(_HISTORY_COLUMNS[dim], 0)
+                columns += [func.sum(value), func.sum(value * value)]
+
+            query = select(*columns).select_from(WorkoutHistory)\
+                .join(Workout, WorkoutHistory.workout_id == Workout.id)\
+                .group_by(WorkoutHistory.user_id, key_column)
+            if user_id is not None:
+                query = query.where(WorkoutHistory.user_id == user_id)
+
+            db.session.execute(insert(FeedbackAggregate).from_select(target_columns, query))
+
+        # Enjoyment of the most recent entry per (user, workout)
+        latest = select(func.coalesce(WorkoutHistory.enjoyment_rating, 0))\
+            .where(WorkoutHistory.user_id == FeedbackAggregate.user_id,
+                   cast(WorkoutHistory.workout_id, String) == FeedbackAggregate.key)\
+            .order_by(WorkoutHistory.id.desc()).limit(1).scalar_subquery()
+        refresh = update(FeedbackAggregate).where(FeedbackAggregate.scope == 'workout')\
+            .values(last_enjoyment=latest).execution_options(synchronize_session=False)
+        if user_id is not None:
+            refresh = refresh.where(FeedbackAggregate.user_id == user_id)
+        db.session.execute(refresh)
+
+        db.session.commit()
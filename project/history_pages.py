@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, tuple_
+from project.models import db, WorkoutHistory
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(entry: WorkoutHistory) -> str:
+    """Opaque cursor pointing just past a history entry"""
+    payload = json.dumps([entry.date.isoformat(), entry.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(date, id) of a cursor; raises ValueError for malformed cursors"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date, entry_id = json.loads(payload)
+        return datetime.fromisoformat(date), int(entry_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def page_size(limit: Optional[int]) -> int:
+    """Clamp a requested page size"""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def history_page(query, cursor: Optional[str] = None,
+                 limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[WorkoutHistory], Optional[str]]:
+    """
+    One page of a WorkoutHistory query, newest first, and the cursor of the next page
+    Keyset pagination on (date, id): each page is an index range read of
+    limit + 1 rows, however far back the page is
+    """
+    query = query.order_by(WorkoutHistory.date.desc(), WorkoutHistory.id.desc())
+    if cursor:
+        query = query.filter(tuple_(WorkoutHistory.date, WorkoutHistory.id) < tuple_(*decode_cursor(cursor)))
+
+    entries = query.limit(limit + 1).all()
+    if len(entries) <= limit:
+        return entries, None
+    entries = entries[:limit]
+    return entries, encode_cursor(entries[-1])
+
+
+def history_summary(user_id: int, workout_id: Optional[int] = None) -> Dict:
+    """
+    Totals shown above a paginated history, computed in one aggregate query
+    Averages skip missing values, as the templates did over the full list
+    """
+    query = db.session.query(
+        func.count(WorkoutHistory.id),
+        func.coalesce(func.sum(WorkoutHistory.duration), 0),
+        func.avg(func.nullif(WorkoutHistory.enjoyment_rating, 0)),
+        func.avg(func.nullif(WorkoutHistory.intensity, 0)),
+        func.avg(func.nullif(WorkoutHistory.completion_rate, 0))
+    ).filter(WorkoutHistory.user_id == user_id)
+    if workout_id is not None:
+        query = query.filter(WorkoutHistory.workout_id == workout_id)
+
+    count, total_duration, avg_enjoyment, avg_intensity, avg_completion = query.one()
+    return {
+        'total_workouts': count,
+        'total_duration': total_duration,
+        'average_enjoyment': avg_enjoyment,
+        'average_intensity': avg_intensity,
+        'average_completion': avg_completion
+    }
+
+
+def history_entry_json(entry: WorkoutHistory) -> Dict:
+    """JSON payload of a history entry (entry.workout should be eager-loaded)"""
+    return {
+        'id': entry.id,
+        'workout_id': entry.workout_id,
+        'workout_name': entry.workout.name,
+        'category': entry.workout.category,
+        'date': entry.date.isoformat(),
+        'duration': entry.duration,
+        'intensity': entry.intensity,
+        'enjoyment_rating': entry.enjoyment_rating,
+        'difficulty_rating': entry.difficulty_rating,
+        'completion_rate': entry.completion_rate,
+        'notes': entry.notes
+    }
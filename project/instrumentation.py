@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Opt-in request instrumentation (enable with FITREC_INSTRUMENTATION=1)
+Times every request, counts SQL queries and their time through engine
+events, times named spans around agent calls and template rendering, and
+aggregates everything into per-route latency histograms served on the
+local-only /metrics endpoint. Dump them from a running server with:
+
+    python -m project.instrumentation -o metrics.json
+"""
+
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Callable, Dict, Optional
+from flask import Flask, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram in the style of HdrHistogram
+    Values (integer microseconds) are grouped by power of two and each group is
+    split into linear sub-buckets, so every recorded value is kept with a
+    relative error below 2 / 2**sub_bucket_bits in a small, sparse table
+    """
+
+    def __init__(self, sub_bucket_bits: int = 7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_buckets = 1 << sub_bucket_bits
+        self.half = self.sub_buckets // 2
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_buckets:
+            return value  # exact below the first power-of-two group
+        exponent = value.bit_length() - self.sub_bucket_bits
+        return self.sub_buckets + (exponent - 1) * self.half + (value >> exponent) - self.half
+
+    def _highest_value(self, index: int) -> int:
+        """Largest value that maps to a bucket"""
+        if index < self.sub_buckets:
+            return index
+        exponent, offset = divmod(index - self.sub_buckets, self.half)
+        exponent += 1
+        return ((offset + self.half + 1) << exponent) - 1
+
+    def record(self, value: float):
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> int:
+        """Value at or below which the given percentage of recordings fall"""
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(percentile / 100.0 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_value(index), self.max)
+        return self.max
+
+    def summary(self, scale: float = 1.0) -> Dict:
+        """Count, mean and tail percentiles, divided by scale (1000.0 turns microseconds into ms)"""
+        return {
+            'count': self.total,
+            'mean': self.sum / self.total / scale if self.total else 0.0,
+            'min': (self.min or 0) / scale,
+            'p50': self.percentile(50) / scale,
+            'p90': self.percentile(90) / scale,
+            'p95': self.percentile(95) / scale,
+            'p99': self.percentile(99) / scale,
+            'p999': self.percentile(99.9) / scale,
+            'max': self.max / scale
+        }
+
+
+class _RequestStats:
+    __slots__ = ('started', 'queries', 'query_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+
+
+class Instrumentation:
+    """Collects per-route request, query and span histograms for one app"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.routes: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self.spans: Dict[str, LatencyHistogram] = {}
+
+    def init_app(self, app: Flask, engine: Engine):
+        """Hook request and engine events (no-op when disabled)"""
+        app.extensions['instrumentation'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._start_render, app, weak=False)
+        template_rendered.connect(self._finish_render, app, weak=False)
+
+    # Requests
+
+    def _start_request(self):
+        self._local.request = _RequestStats()
+
+    def _finish_request(self, exc=None):
+        stats = getattr(self._local, 'request', None)
+        if stats is None:
+            return
+        self._local.request = None
+        elapsed = time.perf_counter() - stats.started
+        rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        route = f'{request.method} {rule}'
+        with self._lock:
+            histograms = self.routes.get(route)
+            if histograms is None:
+                histograms = self.routes[route] = {name: LatencyHistogram()
+                                                   for name in ('latency', 'queries', 'query_time')}
+            histograms['latency'].record(elapsed * 1e6)
+            histograms['queries'].record(stats.queries)
+            histograms['query_time'].record(stats.query_time * 1e6)
+
+    # SQL queries
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        stats = getattr(self._local, 'request', None)
+        if stats is not None:
+            stats.queries += 1
+            stats.query_time += elapsed
+
+    # Spans
+
+    @contextmanager
+    def _timed_span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - started)
+
+    def span(self, name: str):
+        """Context manager timing a named section of work"""
+        return self._timed_span(name) if self.enabled else nullcontext()
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """Wrap func so every call is recorded as a span (for work run on other threads)"""
+        if not self.enabled:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._timed_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def record_span(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = LatencyHistogram()
+            histogram.record(seconds * 1e6)
+
+    def _start_render(self, sender, template, context, **extra):
+        self._local.render_started = time.perf_counter()
+
+    def _finish_render(self, sender, template, context, **extra):
+        started = getattr(self._local, 'render_started', None)
+        if started is not None:
+            self.record_span(f'render:{template.name}', time.perf_counter() - started)
+
+    def snapshot(self) -> Dict:
+        """Latency (ms), queries per request and query time (ms) per route, plus span latencies (ms)"""
+        with self._lock:
+            return {
+                'routes': {route: {'latency_ms': histograms['latency'].summary(1000.0),
+                                   'queries': histograms['queries'].summary(),
+                                   'query_time_ms': histograms['query_time'].summary(1000.0)}
+                           for route, histograms in sorted(self.routes.items())},
+                'spans': {name: histogram.summary(1000.0) for name, histogram in sorted(self.spans.items())}
+            }
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+            self.spans.clear()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Dump request metrics from a running FitRec AI server')
+    parser.add_argument('--url', default='http://127.0.0.1:5000/metrics')
+    parser.add_argument('-o', '--output', help='JSON file to write (default: stdout)')
+    args = parser.parse_args(argv)
+
+    with urllib.request.urlopen(args.url) as response:
+        metrics = json.load(response)
+
+    text = json.dumps(metrics, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
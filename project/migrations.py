@@ -0,0 +1,19 @@
+from typing import List
+from sqlalchemy.engine import Engine
+from project.models import db
+
+
+def apply_migrations(engine: Engine) -> List[str]:
+    """
+    Bring an existing database up to the current schema
+    db.create_all() only creates missing tables, so indexes declared on
+    models after a table was first created are added here when missing.
+    Returns the names of the indexes checked.
+    """
+    applied = []
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                index.create(connection, checkfirst=True)
+                applied.append(index.name)
+    return applied
@@ -61,6 +61,12 @@ class WorkoutHistory(db.Model):
     completion_rate = db.Column(db.Float)  # 0-1 scale
     notes = db.Column(db.Text)
     
+    # Hot paths filter by user (and workout) and order by date
+    __table_args__ = (
+        db.Index('ix_workout_history_user_date', 'user_id', 'date'),
+        db.Index('ix_workout_history_user_workout_date', 'user_id', 'workout_id', 'date'),
+    )
+    
     def get_feedback_vector(self):
         """Get feedback as a vector for RL algorithm"""
         return [
@@ -69,3 +75,23 @@ class WorkoutHistory(db.Model):
             self.completion_rate if self.completion_rate is not None else 0,
             self.intensity if self.intensity is not None else 0
         ]
+
+class FeedbackAggregate(db.Model):
+    """Running feedback statistics per user and workout, category or difficulty"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    scope = db.Column(db.String(20), nullable=False)  # user, workout, category, difficulty
+    key = db.Column(db.String(100), nullable=False, default='')  # workout id, category or difficulty
+    count = db.Column(db.Integer, nullable=False, default=0)
+    rated_count = db.Column(db.Integer, nullable=False, default=0)  # entries with an enjoyment rating
+    enjoyment_sum = db.Column(db.Float, nullable=False, default=0.0)
+    enjoyment_sq_sum = db.Column(db.Float, nullable=False, default=0.0)
+    difficulty_sum = db.Column(db.Float, nullable=False, default=0.0)
+    difficulty_sq_sum = db.Column(db.Float, nullable=False, default=0.0)
+    completion_sum = db.Column(db.Float, nullable=False, default=0.0)
+    completion_sq_sum = db.Column(db.Float, nullable=False, default=0.0)
+    intensity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    intensity_sq_sum = db.Column(db.Float, nullable=False, default=0.0)
+    last_enjoyment = db.Column(db.Float)  # enjoyment of the most recent entry (workout scope)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'scope', 'key'),)
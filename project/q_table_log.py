@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import pickle
+import threading
+import time
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+from project.dense_q_table import DenseQTable
+from project.state_codec import HealthStateCodec
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process file locking
+    fcntl = None
+
+
+class QTableWriteBehindLog:
+    """
+    Write-behind persistence for the enhanced agent's Q-table
+    Each updated Q-row is appended to a JSON-lines log by a background thread and
+    fsynced in configurable batches; the log is periodically folded into the
+    pickled Q-matrix snapshot. Loading replays the log on top of the snapshot,
+    which is also how updates survive a crash between compactions.
+    """
+
+    def __init__(self, snapshot_path: str, codec: HealthStateCodec, log_path: Optional[str] = None,
+                 fsync_batch: int = 32, fsync_interval: float = 1.0, compact_every: int = 1000):
+        self.snapshot_path = snapshot_path
+        self.codec = codec
+        self.log_path = log_path or snapshot_path + '.log'
+        self.fsync_batch = fsync_batch  # records per fsync (0 disables explicit fsync)
+        self.fsync_interval = fsync_interval  # max seconds between write-outs
+        self.compact_every = compact_every  # logged records before compaction (0 disables)
+
+        self._pending: List[Tuple] = []
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._file_lock = threading.Lock()  # serializes file access within this process
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._unsynced = 0
+        self._since_compaction = 0
+        self._last_sync = time.monotonic()
+
+    def load(self) -> np.ndarray:
+        """Load the snapshot and replay any logged updates on top of it"""
+        q_table = DenseQTable(self.codec)
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+            if isinstance(snapshot, dict) and 'state_indices' in snapshot:
+                q_table.values[snapshot['state_indices']] = snapshot['rows']
+            elif isinstance(snapshot, dict):
+                # Dict-of-dicts format written before the dense Q-matrix
+                q_table.load_dict(snapshot)
+        self._replay(q_table)
+        return q_table.values
+
+    def _replay(self, q_table: DenseQTable):
+        """Apply logged updates in order, skipping a torn trailing record"""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r') as f:
+            for line in f:
+                try:
+                    key, values = json.loads(line)
+                    if isinstance(values, dict):
+                        # (state, {action: value}) record from the dict-based table
+                        q_table.load_dict({tuple(key): values})
+                    else:
+                        q_table.values[key] = values
+                except (ValueError, TypeError, IndexError):
+                    continue
+
+    def append(self, state_index: int, values: Sequence[float]):
+        """Queue the updated Q-row of a state; returns without touching the disk"""
+        record = (int(state_index), [float(value) for value in values])
+        with self._condition:
+            if not self._closed:
+                self._pending.append(record)
+                if self._thread is None:
+                    self._start()
+                self._condition.notify_all()
+                return
+        # Writer already stopped (interpreter shutdown): write synchronously
+        self._write([record])
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='q-table-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        """Background writer loop"""
+        while True:
+            with self._condition:
+                if not self._pending and not self._closed:
+                    # Wake up when the oldest unsynced record is due even if no more arrive
+                    timeout = self.fsync_interval
+                    if self._unsynced:
+                        timeout = max(0.0, self._last_sync + self.fsync_interval - time.monotonic())
+                    self._condition.wait(timeout)
+                batch, self._pending = self._pending, []
+                self._in_flight = len(batch)
+                closed = self._closed
+            try:
+                if batch:
+                    self._write(batch)
+                elif self._unsynced and time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync()
+            except Exception as e:
+                print(f"Error writing Q-table log: {e}")
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+            if closed:
+                return
+
+    def _write(self, batch: List[Tuple]):
+        """Append a batch of records and fsync according to the batching policy"""
+        lines = ''.join(json.dumps(record) + '\n' for record in batch)
+        with self._file_lock, open(self.log_path, 'a') as f:
+            self._lock(f)
+            try:
+                f.write(lines)
+                f.flush()
+                self._unsynced += len(batch)
+                now = time.monotonic()
+                if self.fsync_batch and (self._unsynced >= self.fsync_batch
+                                         or now - self._last_sync >= self.fsync_interval):
+                    os.fsync(f.fileno())
+                    self._unsynced = 0
+                    self._last_sync = now
+            finally:
+                self._unlock(f)
+
+        self._since_compaction += len(batch)
+        if self.compact_every and self._since_compaction >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """
+        Fold the log into a new snapshot and truncate it
+        Works from the files rather than this process's table, so updates
+        logged by other workers are kept
+        """
+        if not os.path.exists(self.log_path):
+            return
+        with self._file_lock, open(self.log_path, 'a') as f:
+            self._lock(f)
+            try:
+                values = self.load()
+                tmp_path = self.snapshot_path + '.tmp'
+                with open(tmp_path, 'wb') as snapshot:
+                    pickle.dump(self._sparse_snapshot(values), snapshot)
+                    snapshot.flush()
+                    os.fsync(snapshot.fileno())
+                os.replace(tmp_path, self.snapshot_path)
+                f.truncate(0)
+                self._since_compaction = 0
+            except Exception as e:
+                print(f"Error compacting Q-table log: {e}")
+            finally:
+                self._unlock(f)
+
+    def _sparse_snapshot(self, values: np.ndarray) -> dict:
+        """Only visited (non-zero) rows are stored; the rest load as zeros"""
+        state_indices = np.flatnonzero(np.any(values != 0.0, axis=1)).astype(np.int32)
+        return {'state_indices': state_indices, 'rows': values[state_indices]}
+
+    def flush(self, timeout: float = 5.0):
+        """Block until queued updates have been written"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    break
+                self._condition.wait(remaining)
+
+    def close(self):
+        """Write out queued updates and stop the background writer"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._sync()
+
+    def _sync(self):
+        """fsync records written since the last sync"""
+        if self.fsync_batch and self._unsynced and os.path.exists(self.log_path):
+            with self._file_lock, open(self.log_path, 'a') as f:
+                os.fsync(f.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+
+    def _lock(self, f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(self, f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
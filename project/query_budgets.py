@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Query budget check for the history-heavy pages
+Seeds a throwaway SQLite database with one user who has a long workout
+history, requests each page with the response cache disabled and exits
+non-zero if any page runs more queries than its budget. A page that goes
+back to loading workouts one history row at a time (N+1) blows its budget:
+
+    python -m project.query_budgets
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+from project.query_counter import count_queries
+
+# Most queries each page may run, however long the user's history is
+PAGE_QUERY_BUDGETS = {
+    '/dashboard': 4,
+    '/history': 4,
+    '/analytics': 4,
+    '/workout/{workout_id}': 4,
+    '/api/history': 1,
+    '/api/health-progression': 2
+}
+
+
+def check_query_budgets(history_rows: int = 1000, seed: int = 42) -> List[Tuple[str, int, int, List[str]]]:
+    """(page, queries, budget, statements) for every page, against a freshly seeded user"""
+    from project.app import create_app
+    from project.data_seeder import seed_scale_dataset
+    from project.models import db, User, WorkoutHistory
+
+    workdir = tempfile.mkdtemp(prefix='fitrec-query-budgets-')
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # the enhanced agent keeps its Q-table files in the working directory
+    try:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'budgets.db')}",
+                          'RESPONSE_CACHE_MAX_BYTES': 0})
+        with app.app_context():
+            seed_scale_dataset(num_users=1, num_workouts=50, num_history=history_rows, seed=seed)
+            user_id = User.query.with_entities(User.id).scalar()
+            workout_id = WorkoutHistory.query.with_entities(WorkoutHistory.workout_id).filter_by(user_id=user_id).first()[0]
+            engine = db.engine
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+
+        results = []
+        for page, budget in PAGE_QUERY_BUDGETS.items():
+            path = page.format(workout_id=workout_id)
+            with count_queries(engine) as queries:
+                response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} returned {response.status_code}')
+            results.append((path, queries.count, budget, queries.statements))
+        app.extensions['feedback_queue'].close()
+        return results
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Check that history pages stay within their query budgets')
+    parser.add_argument('--history-rows', type=int, default=1000, help='workout history rows of the seeded user')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the statements of pages over budget')
+    args = parser.parse_args(argv)
+
+    results = check_query_budgets(args.history_rows)
+    failures = []
+    for path, count, budget, statements in results:
+        ok = count <= budget
+        print(f"{'ok  ' if ok else 'OVER'} {path}: {count} queries (budget {budget})")
+        if not ok:
+            failures.append(path)
+            if args.verbose:
+                for statement in statements:
+                    print(f"       {' '.join(statement.split())[:160]}")
+
+    if failures:
+        print(f"\nOver query budget: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
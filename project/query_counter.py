@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """SQL statements executed while a count_queries() block is active"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[QueryCounter]:
+    """
+    Count the queries an engine executes inside the block, e.g. to check that
+    a page renders with a fixed number of queries however long the history is:
+
+        with app.app_context(), count_queries(db.engine) as queries:
+            client.get('/history')
+        assert queries.count <= 3, queries.statements
+
+    project.query_budgets runs this check for the history-heavy pages.
+    """
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter._before_cursor_execute)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Query plan check for the hot WorkoutHistory access patterns
+Seeds a fixed dataset into a throwaway SQLite database, runs EXPLAIN QUERY
+PLAN for each query against it and exits non-zero if any of them falls
+back to a full table scan:
+
+    python -m project.query_plans
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session, joinedload
+from project.models import db, User, WorkoutHistory, FeedbackAggregate
+
+# Tables that must always be reached through an index
+INDEXED_TABLES = ('workout_history', 'user', 'feedback_aggregate')
+
+# Seeder arguments of the dataset the plans are checked against
+PLAN_DATASET = {'num_users': 200, 'num_workouts': 50, 'num_history': 20000, 'seed': 42}
+
+
+def hot_queries() -> Dict[str, object]:
+    """The statements behind the routes, with placeholder ids"""
+    user_history = select(WorkoutHistory).where(WorkoutHistory.user_id == 1)
+    return {
+        'login': select(User).where(User.email == 'user@example.com'),
+        'dashboard_recent': user_history.options(joinedload(WorkoutHistory.workout))
+                                        .order_by(WorkoutHistory.date.desc()).limit(5),
+        'history_page': user_history.options(joinedload(WorkoutHistory.workout))
+                                    .where(tuple_(WorkoutHistory.date, WorkoutHistory.id)
+                                           < tuple_(datetime(2024, 1, 1), 1000))
+                                    .order_by(WorkoutHistory.date.desc(), WorkoutHistory.id.desc()).limit(51),
+        'workout_detail': user_history.where(WorkoutHistory.workout_id == 1)
+                                      .order_by(WorkoutHistory.date.desc(), WorkoutHistory.id.desc()).limit(51),
+        'health_progression': select(WorkoutHistory.date, WorkoutHistory.enjoyment_rating,
+                                     WorkoutHistory.difficulty_rating, WorkoutHistory.completion_rate)
+                              .where(WorkoutHistory.user_id == 1).order_by(WorkoutHistory.date),
+        'analytics_trends': select(WorkoutHistory.date, WorkoutHistory.enjoyment_rating,
+                                   WorkoutHistory.completion_rate).where(WorkoutHistory.user_id == 1),
+        'feedback_aggregates': select(FeedbackAggregate).where(FeedbackAggregate.user_id == 1)
+                                                        .order_by(FeedbackAggregate.id),
+        'feedback_scope': select(FeedbackAggregate).where(FeedbackAggregate.user_id == 1,
+                                                          FeedbackAggregate.scope == 'workout')
+    }
+
+
+def explain(session: Session, statement) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    sql = str(statement.compile(session.get_bind(), compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in session.execute(db.text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def is_full_scan(detail: str) -> bool:
+    """SQLite reports full table scans as 'SCAN <table>' (or 'SCAN TABLE <table>')"""
+    words = detail.replace('SCAN TABLE', 'SCAN').split()
+    return len(words) >= 2 and words[0] == 'SCAN' and words[1] in INDEXED_TABLES
+
+
+def check_query_plans(session: Session) -> List[Tuple[str, List[str], bool]]:
+    """(name, plan, ok) for every hot query"""
+    results = []
+    for name, statement in hot_queries().items():
+        plan = explain(session, statement)
+        results.append((name, plan, not any(is_full_scan(detail) for detail in plan)))
+    return results
+
+
+def main() -> int:
+    from project.app import create_app
+    from project.data_seeder import seed_scale_dataset
+
+    workdir = tempfile.mkdtemp(prefix='fitrec-query-plans-')
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # the enhanced agent keeps its Q-table files in the working directory
+    try:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'plans.db')}"})
+        with app.app_context():
+            seed_scale_dataset(**PLAN_DATASET)
+            results = check_query_plans(db.session)
+        app.extensions['feedback_queue'].close()
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, plan, ok in results:
+        print(f"{'ok  ' if ok else 'SCAN'} {name}")
+        for detail in plan:
+            print(f"       {detail}")
+
+    failures = [name for name, _, ok in results if not ok]
+    if failures:
+        print(f"\nFull table scans in: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class CachedResponse:
+    """Body and metadata of a rendered response"""
+
+    __slots__ = ('body', 'status', 'mimetype', 'expires_at')
+
+    def __init__(self, body: bytes, status: int, mimetype: str, expires_at: float):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    Per-user LRU cache of rendered responses with a TTL and a byte budget
+    Keys start with the user id so every entry of a user can be dropped when
+    their inputs change (completed workout, profile edit); the catalog
+    version is part of the key, so catalog edits retire entries implicitly.
+    Entries and invalidation are local to the process; callers sharing a
+    database across workers put a database-derived version in the key.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+
+        self._entries: 'OrderedDict[Tuple, CachedResponse]' = OrderedDict()
+        self._user_keys: Dict[Hashable, Set[Tuple]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """False when the byte budget (0) leaves no room for any response"""
+        return self.max_bytes > 0
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        """Cached response for key (user id first), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.expires_at <= self.clock():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def set(self, key: Tuple, body: bytes, status: int = 200, mimetype: str = 'text/html'):
+        """Store a response, evicting least recently used entries beyond the byte budget"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CachedResponse(body, status, mimetype, self.clock() + self.ttl)
+            self._user_keys.setdefault(key[0], set()).add(key)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate_user(self, user_id: Hashable):
+        """Drop every cached response of a user"""
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._remove(key)
+            self._invalidations += 1
+
+    def invalidate_users(self, user_ids: Iterable[Hashable]):
+        for user_id in user_ids:
+            self.invalidate_user(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Tuple):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        keys = self._user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[key[0]]
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations
+            }
@@ -1,7 +1,16 @@
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Tuple, Optional
-from project.models import Workout, WorkoutHistory, User
+from typing import List, Dict, Tuple, Optional, Sequence
+from project.models import db, Workout, WorkoutHistory, User
+from project.feedback_store import FeedbackAggregateStore
+from project.catalog import CatalogSnapshot, WorkoutCatalog, workout_catalog
+from project.workout_index import IntensitySafetyIndex
+from project.q_table_log import QTableWriteBehindLog
+from project.state_codec import HealthStateCodec
+from project.dense_q_table import DenseQTable
+from project.shared_q_table import SharedQTable
+from project.scoring import (FeedbackAggregates, aggregates_from_stats, build_workout_index, score_catalog,
+                             top_k_scores, top_k_rows, weighted_scores)
 import json
 import pickle
 import os
@@ -12,13 +21,22 @@ class EnhancedWorkoutRecommendationAgent:
     Models the recommendation problem as an RL environment with health state inputs
     """
     
-    def __init__(self, exploration_rate=0.1, learning_rate=0.01, discount_factor=0.95):
+    # Workout name keywords that are unsafe for each injury
+    INJURY_KEYWORDS = {
+        'back': ['deadlift', 'bend', 'twist'],
+        'knee': ['jump', 'squat', 'lunge']
+    }
+    
+    def __init__(self, exploration_rate=0.1, learning_rate=0.01, discount_factor=0.95,
+                 catalog: WorkoutCatalog = None, q_log_options: Dict = None,
+                 shared_q_table_path: str = None):
         self.exploration_rate = exploration_rate
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         
-        # Q-table: state -> action -> Q-value
-        self.q_table = {}
+        # Shared in-memory workout catalog and its intensity/safety index
+        self.catalog = catalog or workout_catalog
+        self._workout_index: Optional[IntensitySafetyIndex] = None
         
         # State space components
         self.fitness_levels = list(range(1, 11))  # 1-10
@@ -30,6 +48,11 @@ class EnhancedWorkoutRecommendationAgent:
         # Action space: workout intensity levels
         self.intensity_levels = ['low', 'medium', 'high']
         
+        # Dense Q-table: state index (see HealthStateCodec) x action -> Q-value
+        self.state_codec = HealthStateCodec(self.fitness_levels, self.fatigue_levels, self.days_since_last,
+                                            self.age_groups, self.injury_flags, self.intensity_levels)
+        self.q_table = DenseQTable(self.state_codec)
+        
         # Exercise database by intensity and muscle groups
         self.exercise_database = self._initialize_exercise_database()
         
@@ -38,8 +61,15 @@ class EnhancedWorkoutRecommendationAgent:
         self.q_table_file = 'q_table.pkl'
         self.profiles_file = 'user_profiles.pkl'
         
+        # Append-only Q-update log, compacted into q_table_file in the background
+        self.q_log = QTableWriteBehindLog(self.q_table_file, self.state_codec, **(q_log_options or {}))
+        
         # Load existing data
         self._load_persisted_data()
+        
+        # Optionally move the Q-table into a file shared in place by every worker process
+        if shared_q_table_path:
+            self.q_table = SharedQTable(shared_q_table_path, self.state_codec, self.q_table.values)
     
     def _initialize_exercise_database(self) -> Dict:
         """Initialize exercise database categorized by intensity, muscle groups, and injury suitability"""
@@ -171,24 +201,14 @@ class EnhancedWorkoutRecommendationAgent:
     
     def _get_best_action(self, state: Tuple, available_actions: List[str]) -> str:
         """Get best action based on Q-values"""
-        if state not in self.q_table:
-            self.q_table[state] = {action: 0.0 for action in self.intensity_levels}
-        
-        q_values = self.q_table[state]
-        best_action = available_actions[0]
-        best_value = q_values.get(best_action, 0.0)
-        
-        for action in available_actions:
-            value = q_values.get(action, 0.0)
-            if value > best_value:
-                best_value = value
-                best_action = action
-        
-        return best_action
+        return self.q_table.best_action(self.state_codec.encode(state), available_actions)
     
     def _select_workout_for_intensity(self, intensity: str, available_workouts: List[Workout], 
                                     injury_constraints: List[str] = None) -> Workout:
         """Select specific workout for given intensity level"""
+        if isinstance(available_workouts, CatalogSnapshot):
+            return self._select_indexed_workout(intensity, available_workouts, injury_constraints)
+        
         # Filter workouts by intensity
         intensity_workouts = []
         for workout in available_workouts:
@@ -205,6 +225,26 @@ class EnhancedWorkoutRecommendationAgent:
         # Select based on user preferences and history
         return self._select_best_workout(intensity_workouts)
     
+    def _select_indexed_workout(self, intensity: str, snapshot: CatalogSnapshot,
+                                injury_constraints: List[str] = None) -> Workout:
+        """Select the first safe workout for an intensity via the precomputed index"""
+        position = self.get_workout_index(snapshot).first_safe(intensity, injury_constraints)
+        
+        if position is None:
+            # Fallback to any available workout
+            return snapshot[0] if len(snapshot) else None
+        
+        return snapshot[position]
+    
+    def get_workout_index(self, snapshot: CatalogSnapshot) -> IntensitySafetyIndex:
+        """Intensity/safety index for a catalog snapshot, rebuilt when the catalog version changes"""
+        index = self._workout_index
+        if index is None or index.version != snapshot.version:
+            index = IntensitySafetyIndex(snapshot, self._get_workout_intensity,
+                                         self.INJURY_KEYWORDS, version=snapshot.version)
+            self._workout_index = index
+        return index
+    
     def _get_workout_intensity(self, workout: Workout) -> str:
         """Determine workout intensity level"""
         # Map workout difficulty to intensity
@@ -223,9 +263,8 @@ class EnhancedWorkoutRecommendationAgent:
         # Simple safety checks (can be expanded)
         workout_name = workout.name.lower()
         for injury in injury_constraints:
-            if injury.lower() == 'back' and any(word in workout_name for word in ['deadlift', 'bend', 'twist']):
-                return False
-            if injury.lower() == 'knee' and any(word in workout_name for word in ['jump', 'squat', 'lunge']):
+            keywords = self.INJURY_KEYWORDS.get(injury.lower(), [])
+            if any(word in workout_name for word in keywords):
                 return False
         
         return True
@@ -280,24 +319,23 @@ class EnhancedWorkoutRecommendationAgent:
         
         return reward
     
+    def get_q_values(self, state: Tuple) -> Dict[str, float]:
+        """Q-values of every action for a state"""
+        return self.q_table.get_row(self.state_codec.encode(state))
+    
+    def get_best_actions(self) -> Dict[Tuple, str]:
+        """Greedy intensity for every state, computed with a single argmax"""
+        best = self.q_table.best_actions()
+        return {self.state_codec.decode(i): self.intensity_levels[a] for i, a in enumerate(best)}
+    
     def update_q_value(self, state: Tuple, action: str, reward: float, next_state: Tuple = None):
         """
         Update Q-value using Q-learning update rule
         Q(s,a) = Q(s,a) + α[r + γ * max Q(s',a') - Q(s,a)]
         """
-        if state not in self.q_table:
-            self.q_table[state] = {action: 0.0 for action in self.intensity_levels}
-        
-        current_q = self.q_table[state].get(action, 0.0)
-        
-        # Calculate max Q-value for next state
-        max_next_q = 0.0
-        if next_state and next_state in self.q_table:
-            max_next_q = max(self.q_table[next_state].values())
-        
-        # Q-learning update
-        new_q = current_q + self.learning_rate * (reward + self.discount_factor * max_next_q - current_q)
-        self.q_table[state][action] = new_q
+        next_index = self.state_codec.encode(next_state) if next_state else None
+        self.q_table.update(self.state_codec.encode(state), self.state_codec.action_index(action),
+                            reward, self.learning_rate, self.discount_factor, next_index)
     
     def get_recommendation(self, user: User, fatigue_level: int, days_since_last: int,
                           injury_constraints: List[str] = None) -> Dict:
@@ -307,12 +345,61 @@ class EnhancedWorkoutRecommendationAgent:
         # Get current state
         state = self.get_user_health_state(user, fatigue_level, days_since_last, injury_constraints)
         
-        # Get available workouts
-        available_workouts = Workout.query.all()
+        # Get available workouts from the cached catalog snapshot
+        available_workouts = self.catalog.snapshot()
         
         # Select action
         intensity, workout = self.select_action(state, available_workouts, injury_constraints)
         
+        return self._build_recommendation(state, intensity, workout)
+    
+    def get_batch_recommendations(self, health_inputs: Sequence[Tuple[User, int, int, List[str]]]) -> List[Dict]:
+        """
+        Recommendations for many (user, fatigue_level, days_since_last, injury_constraints)
+        inputs at once. Actions for all states come from one masked argmax over
+        their Q-rows, with the ε-greedy draws vectorized alongside.
+        """
+        if not health_inputs:
+            return []
+        
+        available_workouts = self.catalog.snapshot()
+        states = [self.get_user_health_state(user, fatigue_level, days_since_last, injury_constraints)
+                  for user, fatigue_level, days_since_last, injury_constraints in health_inputs]
+        
+        # Position of each action in the state's available-actions list (inf when unavailable);
+        # the list only depends on the state, so it is computed once per distinct state
+        action_ranks = np.empty((len(states), self.state_codec.num_actions), dtype=np.float64)
+        ranks_by_state = {}
+        for row, (state, health_input) in enumerate(zip(states, health_inputs)):
+            ranks = ranks_by_state.get(state)
+            if ranks is None:
+                ranks = np.full(self.state_codec.num_actions, np.inf)
+                for position, action in enumerate(self.get_available_actions(state, health_input[3])):
+                    ranks[self.state_codec.action_index(action)] = position
+                ranks_by_state[state] = ranks
+            action_ranks[row] = ranks
+        available = np.isfinite(action_ranks)
+        
+        # Exploitation: best available Q-value, ties to the first listed action (as _get_best_action)
+        q_values = np.where(available, self.q_table.values[self.state_codec.encode_many(states)], -np.inf)
+        is_best = q_values == q_values.max(axis=1, keepdims=True)
+        greedy_actions = np.argmin(np.where(is_best, action_ranks, np.inf), axis=1)
+        
+        # Exploration: uniform choice among the available actions
+        picks = (np.random.random(len(states)) * available.sum(axis=1)).astype(np.int64)
+        random_actions = np.argmax(action_ranks == picks[:, np.newaxis], axis=1)
+        explore = np.random.random(len(states)) < self.exploration_rate
+        actions = np.where(explore, random_actions, greedy_actions)
+        
+        recommendations = []
+        for state, health_input, action in zip(states, health_inputs, actions):
+            intensity = self.state_codec.actions[action]
+            workout = self._select_workout_for_intensity(intensity, available_workouts, health_input[3])
+            recommendations.append(self._build_recommendation(state, intensity, workout))
+        return recommendations
+    
+    def _build_recommendation(self, state: Tuple, intensity: str, workout: Workout) -> Dict:
+        """Recommendation payload for a selected intensity and workout"""
         if not workout:
             return {"error": "No suitable workout found"}
         
@@ -365,30 +452,28 @@ class EnhancedWorkoutRecommendationAgent:
         # Update Q-value
         self.update_q_value(state, action, reward, next_state)
         
-        # Persist updated Q-table
-        self._save_q_table()
-    
-    def _save_q_table(self):
-        """Save Q-table to disk"""
-        try:
-            with open(self.q_table_file, 'wb') as f:
-                pickle.dump(self.q_table, f)
-        except Exception as e:
-            print(f"Error saving Q-table: {e}")
+        # Queue the update for write-behind persistence
+        state_index = self.state_codec.encode(state)
+        self.q_log.append(state_index, self.q_table.values[state_index])
     
     def _load_persisted_data(self):
         """Load Q-table and user profiles from disk"""
         try:
-            if os.path.exists(self.q_table_file):
-                with open(self.q_table_file, 'rb') as f:
-                    self.q_table = pickle.load(f)
+            # Snapshot plus replay of any updates logged since the last compaction
+            self.q_table = DenseQTable(self.state_codec, self.q_log.load())
         except Exception as e:
             print(f"Error loading Q-table: {e}")
-            self.q_table = {}
+            self.q_table = DenseQTable(self.state_codec)
     
     def get_health_progression_chart(self, user: User) -> Dict:
         """Generate health progression chart data"""
-        user_history = WorkoutHistory.query.filter_by(user_id=user.id).order_by(WorkoutHistory.date).all()
+        # Column-only query: the chart needs the time series, not ORM objects
+        user_history = db.session.query(
+            WorkoutHistory.date,
+            WorkoutHistory.enjoyment_rating,
+            WorkoutHistory.difficulty_rating,
+            WorkoutHistory.completion_rate
+        ).filter(WorkoutHistory.user_id == user.id).order_by(WorkoutHistory.date).all()
         
         if not user_history:
             return {"message": "No workout history available"}
@@ -414,11 +499,12 @@ class WorkoutRecommendationAgent:
     Uses Multi-Armed Bandit approach with contextual features
     """
     
-    def __init__(self, exploration_rate=0.1, learning_rate=0.01):
+    def __init__(self, exploration_rate=0.1, learning_rate=0.01, feedback_store: FeedbackAggregateStore = None):
         self.exploration_rate = exploration_rate
         self.learning_rate = learning_rate
         self.workout_arms = {}  # Store Q-values for each workout
         self.user_contexts = {}  # Store user-specific context
+        self.feedback_store = feedback_store or FeedbackAggregateStore()  # Per-user feedback aggregates
         self.feature_weights = {
             'enjoyment': 0.4,
             'difficulty': 0.2,
@@ -507,28 +593,131 @@ class WorkoutRecommendationAgent:
         if user_id not in self.user_contexts:
             self.user_contexts[user_id] = user_context
         
-        # Get user's workout history
-        user_history = WorkoutHistory.query.filter_by(user_id=user_id).all()
-        
-        # Calculate Q-values for each workout
-        workout_scores = []
+        # Score the whole catalog in a single vectorized pass
+        workout_scores = self.score_workouts(user, available_workouts, user_context)
         
-        for workout in available_workouts:
-            # Base Q-value from historical performance
-            q_value = self._calculate_q_value(workout, user_history)
-            
-            # Contextual bonus based on user preferences
-            contextual_bonus = self._calculate_contextual_bonus(workout, user_context)
-            
-            # Exploration bonus
-            exploration_bonus = self._get_exploration_bonus(workout, user_history)
+        # Select the top recommendations without sorting the whole catalog
+        ranking = top_k_scores(workout_scores, num_recommendations)
+        return [available_workouts[i] for i in ranking]
+    
+    def get_recommendations_page(self, user: User, available_workouts: List[Workout],
+                                 offset: int = 0, limit: int = 5) -> List[Workout]:
+        """Get one page of ranked recommendations"""
+        offset = max(0, offset)
+        workout_scores = self.score_workouts(user, available_workouts)
+        ranking = top_k_scores(workout_scores, offset + max(0, limit))[offset:]
+        return [available_workouts[i] for i in ranking]
+    
+    def get_batch_recommendations(self, users: Sequence[User], available_workouts: List[Workout],
+                                  num_recommendations: int = 5, chunk_size: int = 1000) -> Dict[int, List[Workout]]:
+        """
+        Recommendations for many users, keyed by user id
+        Users are scored chunk by chunk as a (users x workouts) matrix; each
+        chunk loads its feedback aggregates in a single query
+        """
+        # Deduplicate so every user occupies exactly one matrix row
+        users = list({user.id: user for user in users}.values())
+        
+        recommendations = {}
+        for start in range(0, len(users), chunk_size):
+            chunk = users[start:start + chunk_size]
+            rankings = top_k_rows(self.score_workouts_batch(chunk, available_workouts), num_recommendations)
+            for user, ranking in zip(chunk, rankings):
+                recommendations[user.id] = [available_workouts[i] for i in ranking]
+        return recommendations
+    
+    def score_workouts_batch(self, users: Sequence[User], available_workouts: List[Workout]) -> np.ndarray:
+        """
+        Score matrix of distinct users x workouts
+        Row i equals score_workouts(users[i], available_workouts)
+        """
+        workout_ids = getattr(available_workouts, 'ids', None)
+        if workout_ids is None:
+            workout_ids = [w.id for w in available_workouts]
+        
+        shape = (len(users), len(workout_ids))
+        counts = np.zeros(shape, dtype=np.int64)
+        score_sums = np.zeros(shape, dtype=np.float64)
+        
+        user_rows = {user.id: row for row, user in enumerate(users)}
+        if users and len(workout_ids):
+            stat_users, stat_workouts, stat_counts, stat_sums = self.feedback_store.get_workout_arrays(list(user_rows))
+            workout_index = build_workout_index(workout_ids)
+            rows = np.array([user_rows[user_id] for user_id in stat_users.tolist()], dtype=np.int64)
+            columns = np.array([workout_index.get(workout_id, -1) for workout_id in stat_workouts.tolist()],
+                               dtype=np.int64)
             
-            total_score = q_value + contextual_bonus + exploration_bonus
-            workout_scores.append((workout, total_score))
+            # Drop aggregates for workouts that are not part of this catalog
+            known = columns >= 0
+            counts[rows[known], columns[known]] = stat_counts[known]
+            score_sums[rows[known], columns[known]] = weighted_scores(stat_sums[known],
+                                                                      list(self.feature_weights.values()))
+        
+        contextual_bonus = np.empty(shape, dtype=np.float64)
+        bonus_by_context = {}
+        for row, user in enumerate(users):
+            # Users sharing fitness level, goals and equipment share a bonus row
+            user_context = self.get_user_context(user)
+            key = (user_context['fitness_level'], tuple(user_context['goals']),
+                   tuple(user_context['preferences'].get('equipment', [])))
+            bonus = bonus_by_context.get(key)
+            if bonus is None:
+                bonus = self._calculate_contextual_bonuses(available_workouts, user_context)
+                bonus_by_context[key] = bonus
+            contextual_bonus[row] = bonus
+        
+        return score_catalog(FeedbackAggregates(counts, score_sums), contextual_bonus, self.exploration_rate)
+    
+    def score_workouts(self, user: User, available_workouts: List[Workout],
+                       user_context: Dict = None) -> np.ndarray:
+        """
+        Score every available workout for a user
+        Feedback aggregates are built once per call, keyed by workout id
+        """
+        if user_context is None:
+            user_context = self.get_user_context(user)
+        
+        # Catalog snapshots carry precomputed ids; plain lists are indexed here
+        workout_ids = getattr(available_workouts, 'ids', None)
+        if workout_ids is None:
+            workout_ids = [w.id for w in available_workouts]
+        
+        workout_stats = self.feedback_store.get_workout_stats(user.id)
+        aggregates = aggregates_from_stats(workout_ids, workout_stats, list(self.feature_weights.values()))
         
-        # Sort by score and return top recommendations
-        workout_scores.sort(key=lambda x: x[1], reverse=True)
-        return [workout for workout, _ in workout_scores[:num_recommendations]]
+        contextual_bonus = self._calculate_contextual_bonuses(available_workouts, user_context)
+        
+        return score_catalog(aggregates, contextual_bonus, self.exploration_rate)
+    
+    def _calculate_contextual_bonuses(self, available_workouts, user_context: Dict) -> np.ndarray:
+        """
+        Contextual bonus for every workout
+        Uses the feature arrays of a CatalogSnapshot when available and
+        mirrors _calculate_contextual_bonus term by term
+        """
+        if not isinstance(available_workouts, CatalogSnapshot):
+            return np.array([self._calculate_contextual_bonus(w, user_context)
+                             for w in available_workouts], dtype=np.float64)
+        
+        bonus = np.zeros(len(available_workouts), dtype=np.float64)
+        
+        # Fitness level matching
+        bonus += np.where(available_workouts.difficulties == user_context['fitness_level'], 0.2, 0.0)
+        
+        # Goal alignment
+        goals = user_context['goals']
+        if 'weight_loss' in goals:
+            bonus += np.where(available_workouts.categories == 'cardio', 0.3, 0.0)
+        elif 'muscle_gain' in goals:
+            bonus += np.where(available_workouts.categories == 'strength', 0.3, 0.0)
+        elif 'endurance' in goals:
+            bonus += np.where(available_workouts.categories == 'cardio', 0.3, 0.0)
+        
+        # Equipment preference
+        preferred_equipment = user_context['preferences'].get('equipment', [])
+        bonus += np.where(np.isin(available_workouts.equipment, list(preferred_equipment)), 0.1, 0.0)
+        
+        return bonus
     
     def _calculate_q_value(self, workout: Workout, user_history: List[WorkoutHistory]) -> float:
         """Calculate Q-value based on historical performance"""
@@ -595,6 +784,33 @@ class WorkoutRecommendationAgent:
         new_q = current_q + self.learning_rate * (reward - current_q)
         self.workout_arms[workout_id] = new_q
     
+    def update_model_batch(self, workout_ids: Sequence[int], feedback: Sequence[List[float]]):
+        """
+        Apply many update_model calls at once, in order
+        n updates of one arm fold into the closed-form exponential moving average
+        q_n = (1 - lr)^n * q_0 + sum_i lr * (1 - lr)^(n - i) * r_i
+        """
+        if not len(workout_ids):
+            return
+        
+        feedback_matrix = np.array([[f or 0 for f in row] for row in feedback], dtype=np.float64)
+        rewards = weighted_scores(feedback_matrix, list(self.feature_weights.values()))
+        
+        arms, positions = np.unique(np.asarray(workout_ids, dtype=np.int64), return_inverse=True)
+        counts = np.bincount(positions, minlength=len(arms))
+        
+        # 1-based rank of every update within its arm, in submission order
+        order = np.argsort(positions, kind='stable')
+        ranks = np.empty(len(positions), dtype=np.int64)
+        ranks[order] = np.arange(len(positions)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+        
+        decay = 1.0 - self.learning_rate
+        weights = self.learning_rate * decay ** (counts[positions] - ranks)
+        contributions = np.bincount(positions, weights=weights * rewards, minlength=len(arms))
+        
+        for arm, count, contribution in zip(arms.tolist(), counts.tolist(), contributions.tolist()):
+            self.workout_arms[arm] = decay ** count * self.workout_arms.get(arm, 0.0) + contribution
+        
     def get_workout_diversity(self, recommendations: List[Workout]) -> float:
         """Calculate diversity of recommended workouts"""
         if len(recommendations) < 2:
@@ -615,42 +831,32 @@ class WorkoutRecommendationAgent:
         average_similarity = total_similarity / comparisons
         return 1.0 - average_similarity  # Higher diversity = lower similarity
     
-    def get_user_insights(self, user: User) -> Dict:
+    def get_user_insights(self, user: User, aggregates: Dict = None) -> Dict:
         """Get insights about user's workout preferences"""
-        user_history = WorkoutHistory.query.filter_by(user_id=user.id).all()
+        if aggregates is None:
+            aggregates = self.feedback_store.get_user_aggregates(user.id)
+        totals = aggregates['user'].get('')
         
-        if not user_history:
+        if not totals:
             return {"message": "No workout history available"}
         
-        # Analyze preferences
-        category_preferences = {}
-        difficulty_preferences = {}
+        # Most recent enjoyment rating per workout
+        workout_stats = aggregates['workout']
+        workout_names = dict(db.session.query(Workout.id, Workout.name)
+                             .filter(Workout.id.in_([int(key) for key in workout_stats])).all())
         enjoyment_scores = {}
-        
-        for history in user_history:
-            workout = history.workout
-            feedback = history.get_feedback_vector()
-            
-            # Category preferences
-            if workout.category not in category_preferences:
-                category_preferences[workout.category] = []
-            category_preferences[workout.category].append(feedback[0])  # enjoyment
-            
-            # Difficulty preferences
-            if workout.difficulty not in difficulty_preferences:
-                difficulty_preferences[workout.difficulty] = []
-            difficulty_preferences[workout.difficulty].append(feedback[1])  # difficulty rating
-            
-            # Overall enjoyment
-            enjoyment_scores[workout.name] = feedback[0]
+        for key, stats in workout_stats.items():
+            name = workout_names.get(int(key))
+            if name is not None:
+                enjoyment_scores[name] = stats.last_enjoyment
         
         # Calculate averages
         insights = {
-            'favorite_categories': {cat: np.mean(scores) for cat, scores in category_preferences.items()},
-            'preferred_difficulty': {diff: np.mean(scores) for diff, scores in difficulty_preferences.items()},
+            'favorite_categories': {cat: stats.mean('enjoyment') for cat, stats in aggregates['category'].items()},
+            'preferred_difficulty': {diff: stats.mean('difficulty') for diff, stats in aggregates['difficulty'].items()},
             'top_enjoyed_workouts': sorted(enjoyment_scores.items(), key=lambda x: x[1], reverse=True)[:5],
-            'total_workouts': len(user_history),
-            'average_enjoyment': np.mean([h.get_feedback_vector()[0] for h in user_history if h.get_feedback_vector()[0] > 0])
+            'total_workouts': totals.count,
+            'average_enjoyment': totals.sums[0] / totals.rated_count if totals.rated_count else 0.0
         }
         
         return insights
@@ -0,0 +1,123 @@
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Sequence
+
+if TYPE_CHECKING:
+    from project.feedback_store import FeedbackStats
+
+
+class FeedbackAggregates:
+    """
+    Per-workout feedback aggregates aligned with a catalog ordering
+    Built once per request so scoring never rescans the history list
+    """
+
+    def __init__(self, counts: np.ndarray, score_sums: np.ndarray):
+        self.counts = counts
+        self.score_sums = score_sums
+
+    @property
+    def tried(self) -> np.ndarray:
+        """Boolean mask of catalog entries the user has history for"""
+        return self.counts > 0
+
+    @property
+    def q_values(self) -> np.ndarray:
+        """Average weighted feedback score per workout (0.0 when untried)"""
+        q_values = np.zeros(self.counts.shape, dtype=np.float64)
+        tried = self.tried
+        q_values[tried] = self.score_sums[tried] / self.counts[tried]
+        return q_values
+
+
+def build_workout_index(workout_ids: Sequence[int]) -> Dict[int, int]:
+    """Map workout id -> position in the catalog ordering"""
+    return {workout_id: position for position, workout_id in enumerate(workout_ids)}
+
+
+def weighted_scores(feedback: np.ndarray, weights: Sequence[float]) -> np.ndarray:
+    """
+    Weighted feedback score per history row
+    Summed left to right so results match the scalar sum() used by the agent
+    """
+    scores = np.zeros(len(feedback), dtype=np.float64)
+    for column, weight in enumerate(weights):
+        scores = scores + feedback[:, column] * weight
+    return scores
+
+
+def aggregates_from_stats(workout_ids: Sequence[int], workout_stats: Dict[int, 'FeedbackStats'],
+                          weights: Sequence[float]) -> FeedbackAggregates:
+    """Align precomputed per-workout stats from the feedback store with a catalog ordering"""
+    num_workouts = len(workout_ids)
+    counts = np.zeros(num_workouts, dtype=np.int64)
+    score_sums = np.zeros(num_workouts, dtype=np.float64)
+
+    index = build_workout_index(workout_ids)
+    for workout_id, stats in workout_stats.items():
+        position = index.get(workout_id)
+        if position is not None:
+            counts[position] = stats.count
+            score_sums[position] = stats.weighted_sum(weights)
+    return FeedbackAggregates(counts, score_sums)
+
+
+def score_catalog(aggregates: FeedbackAggregates, contextual_bonus: np.ndarray,
+                  exploration_rate: float) -> np.ndarray:
+    """Total score per workout: Q-value + contextual bonus + exploration bonus"""
+    exploration_bonus = np.where(aggregates.tried, 0.0, exploration_rate)
+    return aggregates.q_values + contextual_bonus + exploration_bonus
+
+
+def rank_scores(scores: np.ndarray) -> np.ndarray:
+    """Catalog positions ordered by descending score, ties kept in catalog order"""
+    return np.argsort(-scores, kind='stable')
+
+
+def top_k_scores(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k best scores in ranked order
+    Uses a partial selection (O(n + k log k)) and resolves ties at the cut-off
+    in catalog order, so the result equals rank_scores(scores)[:k]
+    """
+    num_scores = len(scores)
+    if k <= 0 or num_scores == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= num_scores:
+        return rank_scores(scores)
+
+    # Value of the k-th best score
+    threshold = np.partition(scores, num_scores - k)[num_scores - k]
+
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[:k - len(above)]
+    selected = np.concatenate([above, tied])
+
+    # Sort only the selected entries; lexsort keeps catalog order for ties
+    order = np.lexsort((selected, -scores[selected]))
+    return selected[order]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    top_k_scores applied to every row of a (users x workouts) score matrix
+    Row i of the result equals top_k_scores(scores[i], k)
+    """
+    num_rows, num_scores = scores.shape
+    if k <= 0 or num_scores == 0:
+        return np.empty((num_rows, 0), dtype=np.int64)
+    if k >= num_scores:
+        return np.argsort(-scores, axis=1, kind='stable')
+
+    # Value of the k-th best score of each row
+    threshold = np.partition(scores, num_scores - k, axis=1)[:, num_scores - k:num_scores - k + 1]
+
+    # Everything above the threshold plus the first ties in catalog order
+    above = scores > threshold
+    tied = scores == threshold
+    needed = k - above.sum(axis=1, keepdims=True)
+    selected = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+
+    # Exactly k selections per row; nonzero yields them in catalog order
+    positions = np.nonzero(selected)[1].reshape(num_rows, k)
+    order = np.argsort(-np.take_along_axis(scores, positions, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(positions, order, axis=1)
@@ -0,0 +1,58 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from typing import Optional
+
+from project.dense_q_table import DenseQTable
+from project.state_codec import HealthStateCodec
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process file locking
+    fcntl = None
+
+
+class SharedQTable(DenseQTable):
+    """
+    Dense Q-table in a memory-mapped file shared by every worker process
+    All processes map the same pages, so an update made by one worker is
+    visible to the others immediately and the table exists once in memory.
+    Reads are lock-free; read-modify-write updates take a process-local lock
+    plus an flock on a sidecar lock file.
+    """
+
+    def __init__(self, path: str, codec: HealthStateCodec, initial_values: Optional[np.ndarray] = None):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._lock_file = open(path + '.lock', 'a')
+
+        size = codec.num_states * codec.num_actions * np.dtype(np.float64).itemsize
+        with self._locked():
+            created = not os.path.exists(path) or os.path.getsize(path) != size
+            if created:
+                with open(path, 'wb') as f:
+                    f.truncate(size)
+            values = np.memmap(path, dtype=np.float64, mode='r+', shape=codec.shape)
+            if created and initial_values is not None:
+                values[:] = initial_values
+                values.flush()
+
+        super().__init__(codec, values)
+
+    def flush(self):
+        """Ask the OS to write dirty pages back to the file"""
+        self.values.flush()
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive access across threads and, where flock exists, processes"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,48 @@
+import numpy as np
+from typing import Iterable, Sequence, Tuple
+
+
+class HealthStateCodec:
+    """
+    Maps enhanced-agent health states (fitness, fatigue, days_since_last,
+    age_group, injury_flag) to a single integer index and intensity actions
+    to column indices of a dense Q-matrix
+    """
+
+    def __init__(self, fitness_levels: Sequence, fatigue_levels: Sequence, days_since_last: Sequence,
+                 age_groups: Sequence, injury_flags: Sequence, actions: Sequence[str]):
+        self.components = (tuple(fitness_levels), tuple(fatigue_levels), tuple(days_since_last),
+                           tuple(age_groups), tuple(injury_flags))
+        self.actions = tuple(actions)
+        self._lookups = [{value: i for i, value in enumerate(values)} for values in self.components]
+        self._action_lookup = {action: i for i, action in enumerate(self.actions)}
+
+        self.state_shape = tuple(len(values) for values in self.components)
+        self.num_states = int(np.prod(self.state_shape))
+        self.num_actions = len(self.actions)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Shape of the dense Q-matrix: (num_states, num_actions)"""
+        return (self.num_states, self.num_actions)
+
+    def state_cell(self, state: Sequence) -> Tuple[int, ...]:
+        """Per-component indices of a state (lists from JSON sessions are accepted)"""
+        return tuple(lookup[value] for lookup, value in zip(self._lookups, state))
+
+    def encode(self, state: Sequence) -> int:
+        """Row index of a state; raises KeyError for values outside the state space"""
+        return int(np.ravel_multi_index(self.state_cell(state), self.state_shape))
+
+    def encode_many(self, states: Iterable[Sequence]) -> np.ndarray:
+        """Row indices of many states in one call"""
+        cells = np.array([self.state_cell(state) for state in states], dtype=np.int64).reshape(-1, len(self.state_shape))
+        return np.ravel_multi_index(cells.T, self.state_shape)
+
+    def decode(self, index: int) -> Tuple:
+        """State tuple for a row index"""
+        cell = np.unravel_index(int(index), self.state_shape)
+        return tuple(values[i] for values, i in zip(self.components, cell))
+
+    def action_index(self, action: str) -> int:
+        return self._action_lookup[action]
@@ -0,0 +1,54 @@
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Sequence
+
+
+class IntensitySafetyIndex:
+    """
+    Inverted index over a workout catalog for the enhanced agent
+    Maps intensity -> workouts and injury -> unsafe workouts as bitsets
+    (Python ints, bit i = catalog position i), so selecting a safe workout
+    for an (intensity, injury set) pair is a few integer operations
+    """
+
+    def __init__(self, workouts: Sequence, intensity_of: Callable[[object], str],
+                 injury_keywords: Dict[str, Sequence[str]], version: Optional[int] = None):
+        self.version = version
+        self.size = len(workouts)
+        self.intensity_masks: Dict[str, int] = {}
+        self.unsafe_masks: Dict[str, int] = {injury: 0 for injury in injury_keywords}
+        self._safe_cache: Dict[tuple, int] = {}
+
+        for position, workout in enumerate(workouts):
+            bit = 1 << position
+            intensity = intensity_of(workout)
+            self.intensity_masks[intensity] = self.intensity_masks.get(intensity, 0) | bit
+
+            workout_name = workout.name.lower()
+            for injury, keywords in injury_keywords.items():
+                if any(word in workout_name for word in keywords):
+                    self.unsafe_masks[injury] |= bit
+
+    def _normalize_injuries(self, injury_constraints: Optional[Iterable[str]]) -> FrozenSet[str]:
+        """Injuries that actually restrict the catalog"""
+        if not injury_constraints:
+            return frozenset()
+        return frozenset(injury.lower() for injury in injury_constraints
+                         if injury.lower() in self.unsafe_masks)
+
+    def safe_mask(self, intensity: str, injury_constraints: Optional[Iterable[str]] = None) -> int:
+        """Bitset of workouts with the given intensity that are safe for all injuries"""
+        injuries = self._normalize_injuries(injury_constraints)
+        key = (intensity, injuries)
+        mask = self._safe_cache.get(key)
+        if mask is None:
+            mask = self.intensity_masks.get(intensity, 0)
+            for injury in injuries:
+                mask &= ~self.unsafe_masks[injury]
+            self._safe_cache[key] = mask
+        return mask
+
+    def first_safe(self, intensity: str, injury_constraints: Optional[Iterable[str]] = None) -> Optional[int]:
+        """Catalog position of the first matching workout, or None"""
+        mask = self.safe_mask(intensity, injury_constraints)
+        if not mask:
+            return None
+        return (mask & -mask).bit_length() - 1